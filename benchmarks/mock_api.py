@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import time
+import hashlib
+from collections import Counter
+import brotli
+from aiohttp import web
+
+# Local stand-in for the World Aquatics API used by the crawlers:
+#   GET /fina/athletes?page=&pageSize=   paged roster with pageInfo.numPages
+#   GET /fina/athletes/{id}/results      synthetic results payload per athlete
+#   GET /__stats, POST /__reset          request counters and latency percentiles
+# Run with e.g. `python benchmarks/mock_api.py --athletes 50000 --latency 0.02 --rate-429 0.01`
+# and point the crawlers at it with SWIM_API_BASE=http://127.0.0.1:8765.
+
+DISCIPLINES = [
+    'Men 50m Freestyle', 'Women 100m Backstroke', 'Men 200m Breaststroke', 'Women 400m Individual Medley',
+    'Men 4 x 100m Freestyle', 'Women 1500m Freestyle', 'Men 100m Butterfly', 'Women 200m Freestyle',
+]
+PHASES = ['Heats', 'Semifinal', 'Final', 'Swim-off']
+COUNTRIES = ['AUS', 'USA', 'GBR', 'CHN', 'JPN', 'FRA', 'ITA', 'CAN', 'HUN', 'NED']
+FIRST_ATHLETE_ID = 1000000
+
+
+def make_athlete(athlete_id):
+    rng = random.Random(athlete_id)
+    first_name = f'Athlete{athlete_id}'
+    last_name = rng.choice(['SMITH', 'NGUYEN', 'ROSSI', 'MÜLLER', 'TANAKA', 'DUPONT'])
+    return {
+        'id': athlete_id,
+        'providerId': f'{athlete_id:08x}-0000-4000-8000-000000000000',
+        'firstName': first_name,
+        'lastName': last_name,
+        'fullName': f'{first_name} {last_name}',
+        'dateOfBirth': f'{rng.randint(1950, 2010)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'nationality': rng.choice(COUNTRIES),
+        'gender': rng.choice(['M', 'F']),
+        'disciplines': ['SW'],
+        'metadata': {},
+        'height': rng.choice([None, rng.randint(160, 205)]),
+    }
+
+
+def make_results(athlete_id, results_per_athlete):
+    rng = random.Random(-athlete_id)
+    count = rng.randint(0, 2 * results_per_athlete)
+    results = []
+    for _ in range(count):
+        year = rng.randint(1990, 2024)
+        results.append({
+            'Rank': rng.randint(1, 64),
+            'MedalTag': rng.choice([None, 'G', 'S', 'B']),
+            'SportCode': 'SW',
+            'DisciplineName': rng.choice(DISCIPLINES),
+            'PhaseName': rng.choice(PHASES),
+            'RecordType': rng.choice([None, None, None, 'WR', 'CR']),
+            'NAT': rng.choice(COUNTRIES),
+            'CompetitionName': f'Synthetic Championships {year}',
+            'CompetitionType': rng.choice(['OG', 'WCH', 'NCH']),
+            'CompetitionCountry': rng.choice(COUNTRIES),
+            'CompetitionCity': rng.choice(['Paris', 'Tokyo', 'Budapest', 'Fukuoka', 'Doha']),
+            'Date': f'{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00',
+            'Time': f'{rng.randint(0, 15)}:{rng.randint(0, 59):02d}.{rng.randint(0, 99):02d}',
+            'Tags': None,
+            'AthleteResultAge': rng.randint(12, 40),
+            'Points': rng.randint(300, 1000),
+            'UtcDateTime': f'{year}-07-01T10:00:00Z',
+            'ClubName': None,
+        })
+    return {'FullName': f'Athlete{athlete_id}', 'Results': results}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def create_app(athletes, latency=0.0, jitter=0.0, encoding='identity', rate_429=0.0, rate_504=0.0,
+               results_per_athlete=10, etags=True, seed=0):
+    rng = random.Random(seed)
+    stats = {'status': Counter(), 'latencies': [], 'bytes': 0, 'started': time.time()}
+
+    def encode(body):
+        if encoding == 'br':
+            return brotli.compress(body, quality=4), {'Content-Encoding': 'br'}
+        if encoding == 'gzip':
+            return gzip.compress(body, compresslevel=6), {'Content-Encoding': 'gzip'}
+        if encoding == 'zstd':
+            import zstandard
+            return zstandard.ZstdCompressor(level=3).compress(body), {'Content-Encoding': 'zstd'}
+        return body, {}
+
+    async def respond(request, make_payload):
+        started = time.perf_counter()
+        delay = latency + (rng.uniform(0, jitter) if jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = rng.random()
+        if roll < rate_429:
+            response = web.Response(status=429, headers={'Retry-After': '1'})
+        elif roll < rate_429 + rate_504:
+            response = web.Response(status=504)
+        else:
+            raw = json.dumps(make_payload(), separators=(',', ':')).encode('utf-8')
+            etag = f'"{hashlib.md5(raw).hexdigest()}"'
+            if etags and request.headers.get('If-None-Match') == etag:
+                response = web.Response(status=304, headers={'ETag': etag})
+            else:
+                body, headers = encode(raw)
+                if etags:
+                    headers['ETag'] = etag
+                response = web.Response(body=body, status=200, content_type='application/json', headers=headers)
+                stats['bytes'] += len(body)
+        stats['status'][response.status] += 1
+        stats['latencies'].append(time.perf_counter() - started)
+        return response
+
+    async def roster(request):
+        page = int(request.query.get('page', 0))
+        page_size = int(request.query.get('pageSize', 50))
+        num_pages = (athletes + page_size - 1) // page_size
+        first = FIRST_ATHLETE_ID + page * page_size
+        last = min(FIRST_ATHLETE_ID + athletes, first + page_size)
+        return await respond(request, lambda: {
+            'content': [make_athlete(athlete_id) for athlete_id in range(first, last)],
+            'pageInfo': {'page': page, 'numPages': num_pages, 'numEntries': athletes},
+        })
+
+    async def results(request):
+        athlete_id = int(request.match_info['athlete_id'])
+        if not FIRST_ATHLETE_ID <= athlete_id < FIRST_ATHLETE_ID + athletes:
+            stats['status'][404] += 1
+            return web.Response(status=404)
+        return await respond(request, lambda: make_results(athlete_id, results_per_athlete))
+
+    async def get_stats(request):
+        latencies = stats['latencies']
+        return web.json_response({
+            'requests': sum(stats['status'].values()),
+            'status': {str(code): count for code, count in stats['status'].items()},
+            'bytes': stats['bytes'],
+            'latency_p50': percentile(latencies, 0.50),
+            'latency_p99': percentile(latencies, 0.99),
+        })
+
+    async def reset(request):
+        stats['status'].clear()
+        stats['latencies'].clear()
+        stats['bytes'] = 0
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_get('/fina/athletes', roster)
+    app.router.add_get('/fina/athletes/{athlete_id}/results', results)
+    app.router.add_get('/__stats', get_stats)
+    app.router.add_post('/__reset', reset)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a synthetic World Aquatics athletes API for local benchmarks.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--athletes', type=int, default=1000, help='number of athletes in the roster')
+    parser.add_argument('--latency', type=float, default=0.0, help='fixed response delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra uniform random delay in seconds')
+    parser.add_argument('--encoding', choices=['identity', 'gzip', 'br', 'zstd'], default='identity')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--rate-504', type=float, default=0.0, help='fraction of requests answered with 504')
+    parser.add_argument('--results-per-athlete', type=int, default=10, help='mean number of results per athlete')
+    parser.add_argument('--no-etags', action='store_true', help='do not send ETags or answer 304')
+    args = parser.parse_args()
+    web.run_app(
+        create_app(args.athletes, args.latency, args.jitter, args.encoding, args.rate_429, args.rate_504,
+                   args.results_per_athlete, etags=not args.no_etags),
+        host=args.host, port=args.port, print=None,
+    )
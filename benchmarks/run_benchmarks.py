@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+# Crawler throughput benchmark against benchmarks/mock_api.py.
+# For every roster size it starts a mock server, runs the roster crawler and then the results
+# crawler (with --skip-db) in a scratch directory, and reports requests/s, server-side p50/p99
+# latency, bytes served and the crawler's peak RSS.
+#
+#   python benchmarks/run_benchmarks.py --sizes 1000,50000 --latency 0.02 --json bench.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOCK_API = os.path.join(ROOT, 'benchmarks', 'mock_api.py')
+CRAWLERS = [
+    ('roster', [os.path.join(ROOT, 'get_swimmers_information.py')]),
+    ('results', [os.path.join(ROOT, 'swim_load_results_update_mysql.py'), '--skip-db']),
+]
+
+
+def call_mock(base, path, method='GET'):
+    request = urllib.request.Request(base + path, method=method, data=b'' if method == 'POST' else None)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def wait_for_mock(base, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            return call_mock(base, '/__stats')
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Mock API at {base} did not start within {timeout}s')
+
+
+# Run one crawler to completion and return (exit code, wall seconds, peak RSS in MiB)
+def run_crawler(command, workdir, env):
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, *command], cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, time.perf_counter() - started, usage.ru_maxrss / 1024
+
+
+def benchmark_size(size, args):
+    base = f'http://127.0.0.1:{args.port}'
+    mock = subprocess.Popen([
+        sys.executable, MOCK_API, '--port', str(args.port), '--athletes', str(size),
+        '--latency', str(args.latency), '--jitter', str(args.jitter), '--encoding', args.encoding,
+        '--rate-429', str(args.rate_429), '--rate-504', str(args.rate_504),
+        '--results-per-athlete', str(args.results_per_athlete),
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    rows = []
+    try:
+        wait_for_mock(base)
+        with tempfile.TemporaryDirectory(prefix='swim-bench-') as workdir:
+            env = {
+                **os.environ,
+                'SWIM_API_BASE': base,
+                'SWIM_CACHE_DIR': os.path.join(workdir, '.swim_cache'),
+                'SWIM_INITIAL_RATE': str(args.max_rate),
+                'SWIM_MAX_RATE': str(args.max_rate),
+                'SWIM_MAX_CONCURRENCY': str(args.concurrency),
+            }
+            for name, command in CRAWLERS:
+                call_mock(base, '/__reset', method='POST')
+                exit_code, elapsed, peak_rss = run_crawler(command, workdir, env)
+                stats = call_mock(base, '/__stats')
+                rows.append({
+                    'crawler': name,
+                    'athletes': size,
+                    'exit_code': exit_code,
+                    'seconds': round(elapsed, 3),
+                    'requests': stats['requests'],
+                    'requests_per_second': round(stats['requests'] / elapsed, 1) if elapsed else 0.0,
+                    'latency_p50_ms': round(stats['latency_p50'] * 1000, 2),
+                    'latency_p99_ms': round(stats['latency_p99'] * 1000, 2),
+                    'bytes': stats['bytes'],
+                    'status': stats['status'],
+                    'peak_rss_mib': round(peak_rss, 1),
+                })
+    finally:
+        mock.terminate()
+        mock.wait()
+    return rows
+
+
+def print_table(rows):
+    header = f"{'crawler':<8} {'athletes':>9} {'seconds':>9} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'RSS MiB':>8} exit"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['crawler']:<8} {row['athletes']:>9} {row['seconds']:>9.1f} {row['requests']:>9} "
+              f"{row['requests_per_second']:>8.1f} {row['latency_p50_ms']:>8.2f} {row['latency_p99_ms']:>8.2f} "
+              f"{row['peak_rss_mib']:>8.1f} {row['exit_code']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the roster and results crawlers against the local mock API.')
+    parser.add_argument('--sizes', default='1000,50000,500000', help='comma separated roster sizes')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--encoding', choices=['identity', 'gzip', 'br', 'zstd'], default='br')
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-504', type=float, default=0.0)
+    parser.add_argument('--results-per-athlete', type=int, default=10)
+    parser.add_argument('--max-rate', type=float, default=2000, help='SWIM_MAX_RATE given to the crawlers')
+    parser.add_argument('--concurrency', type=int, default=64, help='SWIM_MAX_CONCURRENCY given to the crawlers')
+    parser.add_argument('--json', help='also write the rows to this JSON file')
+    args = parser.parse_args()
+
+    rows = []
+    for size in (int(value) for value in args.sizes.split(',')):
+        rows.extend(benchmark_size(size, args))
+    print_table(rows)
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(rows, handle, indent=2)
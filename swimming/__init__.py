@@ -0,0 +1,3 @@
+# World Aquatics swimmer roster and results crawler, artifact writer and MySQL loader.
+# Importing the package (or any stage module) has no side effects: no event loop patching, .env
+# loading or file reads happen until a stage is run, e.g. through `python -m swimming <command>`.
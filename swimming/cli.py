@@ -0,0 +1,35 @@
+import sys
+import argparse
+import importlib
+
+# Subcommands and the module implementing each one. A module is only imported when its subcommand
+# runs, so `--help` and small jobs never pay for the crawler's or the loader's dependencies.
+COMMANDS = {
+    'roster': ('swimming.roster', 'crawl every swimmer from the World Aquatics athletes endpoint into all_swimmers.csv'),
+    'results': ('swimming.results', 'crawl every swimmer\'s results, write the zip, CSV shard and Parquet artifacts and update MySQL'),
+    'load': ('swimming.load', 'reload MySQL from an existing results artifact, without network calls'),
+    'run': ('swimming.pipeline', 'crawl the roster and its results side by side, publish them and load MySQL during the crawl'),
+}
+
+
+def build_parser(command=None):
+    parser = argparse.ArgumentParser(prog='swimming', description='World Aquatics swimmer data pipeline.')
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='command')
+    for name, (module, description) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=description, description=description)
+        if name == command:
+            importlib.import_module(module).add_arguments(subparser)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Load environment variables (DB_PASSWORD, SWIM_* settings) before any stage module reads them
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    # Only the chosen subcommand's module is imported to build its arguments
+    command = next((arg for arg in argv if not arg.startswith('-')), None)
+    args = build_parser(command if command in COMMANDS else None).parse_args(argv)
+    importlib.import_module(COMMANDS[args.command][0]).run(args)
+    return 0
@@ -0,0 +1,105 @@
+import os
+import time
+import sqlite3
+from swimming.results_cache import CACHE_DIR
+
+# Durable record of crawl progress, so a crawl that dies part way can resume
+JOURNAL_PATH = os.path.join(CACHE_DIR, 'crawl_journal.sqlite')
+# Unfinished runs older than this are abandoned instead of resumed
+JOURNAL_MAX_AGE = float(os.getenv('SWIM_JOURNAL_MAX_AGE_HOURS', 24)) * 3600
+COMMIT_EVERY = 200
+
+
+# Checkpoint journal for one crawler ('roster' pages or 'results' athlete ids).
+# Opening it resumes the crawler's latest unfinished run, or starts a new one; every finished
+# item is recorded with its outcome ('ok' or 'failed'), and finish() closes the run once its
+# artifacts have been written. Outcomes are buffered and written in one short transaction per
+# COMMIT_EVERY items, so the roster and results journals can share the file while both crawl.
+class CrawlJournal:
+    def __init__(self, crawler, path=JOURNAL_PATH, fresh=False, max_age=JOURNAL_MAX_AGE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.crawler = crawler
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                crawler TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            )
+        ''')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS items (
+                run_id INTEGER NOT NULL,
+                item INTEGER NOT NULL,
+                outcome TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, item)
+            )
+        ''')
+        self.pending = []
+        self.run_id = None
+        self.resumed = False
+        now = time.time()
+        if not fresh:
+            row = self.connection.execute(
+                'SELECT run_id FROM runs WHERE crawler = ? AND finished_at IS NULL AND started_at >= ? '
+                'ORDER BY run_id DESC LIMIT 1',
+                (crawler, now - max_age)
+            ).fetchone()
+            if row:
+                self.run_id = row[0]
+                self.resumed = True
+        # Abandon any other unfinished runs of this crawler
+        self.connection.execute(
+            'UPDATE runs SET finished_at = ? WHERE crawler = ? AND finished_at IS NULL AND run_id IS NOT ?',
+            (now, crawler, self.run_id)
+        )
+        if self.run_id is None:
+            self.run_id = self.connection.execute(
+                'INSERT INTO runs (crawler, started_at) VALUES (?, ?)', (crawler, now)
+            ).lastrowid
+        self.connection.commit()
+
+    # Items of this run that finished successfully
+    def completed(self):
+        self.commit()
+        return {row[0] for row in self.connection.execute(
+            "SELECT item FROM items WHERE run_id = ? AND outcome = 'ok'", (self.run_id,)
+        )}
+
+    # Outcome counts of this run, e.g. {'ok': 1200, 'failed': 3}
+    def summary(self):
+        self.commit()
+        return dict(self.connection.execute(
+            'SELECT outcome, COUNT(*) FROM items WHERE run_id = ? GROUP BY outcome', (self.run_id,)
+        ).fetchall())
+
+    def record(self, item, outcome):
+        self.pending.append((self.run_id, int(item), outcome, time.time()))
+        if len(self.pending) >= COMMIT_EVERY:
+            self.commit()
+
+    # Mark the run as complete so the next crawl starts from scratch
+    def finish(self):
+        self.connection.execute('UPDATE runs SET finished_at = ? WHERE run_id = ?', (time.time(), self.run_id))
+        self.commit()
+
+    def commit(self):
+        if self.pending:
+            self.connection.executemany(
+                'INSERT INTO items (run_id, item, outcome, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (run_id, item) DO UPDATE SET outcome = excluded.outcome, '
+                'attempts = attempts + 1, updated_at = excluded.updated_at',
+                self.pending
+            )
+            self.pending = []
+        self.connection.commit()
+
+    def close(self):
+        self.commit()
+        self.connection.close()
@@ -0,0 +1,122 @@
+import os
+import time
+import sqlite3
+import datetime
+from collections import Counter
+import polars as pl
+from swimming.results_cache import CACHE_DIR
+
+# When each athlete was last crawled and the date of their most recent result
+SCHEDULE_DB_PATH = os.path.join(CACHE_DIR, 'crawl_schedule.sqlite')
+
+# Activity tiers by the age of an athlete's most recent result: 'active' within SWIM_ACTIVE_YEARS,
+# 'lapsed' within SWIM_LAPSED_YEARS, 'retired' beyond that, and 'no_results' when they have none yet
+ACTIVE_YEARS = float(os.getenv('SWIM_ACTIVE_YEARS', 2))
+LAPSED_YEARS = float(os.getenv('SWIM_LAPSED_YEARS', 6))
+
+# How often each tier is re-crawled, in days
+REFRESH_DAYS = {
+    'active': float(os.getenv('SWIM_REFRESH_ACTIVE_DAYS', 7)),
+    'lapsed': float(os.getenv('SWIM_REFRESH_LAPSED_DAYS', 30)),
+    'retired': float(os.getenv('SWIM_REFRESH_RETIRED_DAYS', 180)),
+    'no_results': float(os.getenv('SWIM_REFRESH_NO_RESULTS_DAYS', 30)),
+}
+
+
+# Tier of an athlete given the ISO date of their most recent result (or None)
+def activity_tier(last_result_date, today=None):
+    if not last_result_date:
+        return 'no_results'
+    today = today or datetime.date.today()
+    age_years = (today - datetime.date.fromisoformat(last_result_date)).days / 365.25
+    if age_years <= ACTIVE_YEARS:
+        return 'active'
+    if age_years <= LAPSED_YEARS:
+        return 'lapsed'
+    return 'retired'
+
+
+# One-line breakdown of how many athletes of each tier are due, from per-tier Counters
+def schedule_summary(tiers, due_tiers):
+    breakdown = ', '.join(f"{tier} {due_tiers[tier]}/{count}" for tier, count in sorted(tiers.items()))
+    return f"Crawl schedule: {sum(due_tiers.values())} of {sum(tiers.values())} athletes due ({breakdown})."
+
+
+# Refresh policy for the results crawler. Athletes that were never crawled are always due;
+# everyone else is due once the refresh interval of their activity tier has elapsed since
+# their last successful crawl. Athletes that are not due are served from the response store.
+class CrawlSchedule:
+    def __init__(self, path=SCHEDULE_DB_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS athlete_activity (
+                athlete_id INTEGER PRIMARY KEY,
+                last_result_date TEXT,
+                crawled_at REAL
+            )
+        ''')
+
+    # Load the schedule once and return a function giving an athlete's (tier, due) at `now`;
+    # athletes never crawled are in the 'new' tier and always due
+    def due_checker(self, now=None):
+        now = now or time.time()
+        today = datetime.date.fromtimestamp(now)
+        known = {row[0]: (row[1], row[2]) for row in self.connection.execute(
+            'SELECT athlete_id, last_result_date, crawled_at FROM athlete_activity'
+        )}
+
+        def check(swimmer_id):
+            last_result_date, crawled_at = known.get(int(swimmer_id), (None, None))
+            if crawled_at is None:
+                return 'new', True
+            tier = activity_tier(last_result_date, today)
+            return tier, now - crawled_at >= REFRESH_DAYS[tier] * 86400
+
+        return check
+
+    # Split ids into (due, not due) and print how many of each tier are due
+    def split(self, swimmer_ids, now=None):
+        check = self.due_checker(now)
+        due_ids, skipped_ids = [], []
+        tiers, due_tiers = Counter(), Counter()
+        for swimmer_id in swimmer_ids:
+            tier, due = check(swimmer_id)
+            tiers[tier] += 1
+            if due:
+                due_tiers[tier] += 1
+                due_ids.append(swimmer_id)
+            else:
+                skipped_ids.append(swimmer_id)
+        print(schedule_summary(tiers, due_tiers))
+        return due_ids, skipped_ids
+
+    # Mark athletes as successfully crawled now
+    def record_crawled(self, swimmer_ids, now=None):
+        now = now or time.time()
+        self.connection.executemany(
+            'INSERT INTO athlete_activity (athlete_id, crawled_at) VALUES (?, ?) '
+            'ON CONFLICT (athlete_id) DO UPDATE SET crawled_at = excluded.crawled_at',
+            ((int(swimmer_id), now) for swimmer_id in swimmer_ids)
+        )
+        self.connection.commit()
+
+    # Refresh every athlete's most recent result date from the results spool
+    def update_activity(self, spool_path):
+        latest = (pl.scan_parquet(spool_path)
+                  .group_by('swimmer_id')
+                  .agg(pl.col('Date').max())
+                  .drop_nulls('Date')
+                  .collect())
+        self.connection.executemany(
+            'INSERT INTO athlete_activity (athlete_id, last_result_date) VALUES (?, ?) '
+            'ON CONFLICT (athlete_id) DO UPDATE SET last_result_date = excluded.last_result_date',
+            ((int(swimmer_id), date.isoformat()) for swimmer_id, date in latest.iter_rows())
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
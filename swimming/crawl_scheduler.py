@@ -0,0 +1,220 @@
+import os
+import heapq
+import random
+import asyncio
+import itertools
+from tqdm.asyncio import tqdm
+
+# Scheduler limits, overridable from the environment (e.g. the GitHub Actions workflow)
+MAX_CONCURRENCY = int(os.getenv('SWIM_MAX_CONCURRENCY', 32))
+INITIAL_RATE = float(os.getenv('SWIM_INITIAL_RATE', 10))
+MIN_RATE = float(os.getenv('SWIM_MIN_RATE', 0.5))
+MAX_RATE = float(os.getenv('SWIM_MAX_RATE', 100))
+RATE_INCREASE = float(os.getenv('SWIM_RATE_INCREASE', 1))
+RATE_DECREASE = float(os.getenv('SWIM_RATE_DECREASE', 0.5))
+THROTTLE_PAUSE = float(os.getenv('SWIM_THROTTLE_PAUSE', 10))
+
+# Retry policy per error class: (attempts in total, base delay in seconds). The delay before retry n
+# is drawn uniformly from [0, base * 2**(n-1)], capped at SWIM_RETRY_MAX_DELAY ("full jitter"), so
+# ids that failed together do not come back together. Throttles retry as soon as the rate limiter's
+# pause allows, a 404 gets one late retry, and other 4xx responses are not retried at all.
+RETRY_RULES = {
+    'timeout': (5, 2.0),
+    'connection': (5, 1.0),
+    'server': (5, 5.0),
+    'throttled': (8, 0.0),
+    'not_found': (2, 30.0),
+    'decode': (2, 1.0),
+    'client': (1, 0.0),
+}
+RETRY_MAX_DELAY = float(os.getenv('SWIM_RETRY_MAX_DELAY', 120))
+
+
+# AIMD request pacer shared by every worker of a crawl.
+# The rate (requests per second) grows by `increase` for every `rate` successful
+# requests and is multiplied by `decrease` when the API throttles (429) or fails (5xx).
+# A throttle also pauses all workers, so one 429 slows everybody down instead of
+# just the coroutine that received it.
+class AdaptiveRateLimiter:
+    def __init__(self, initial_rate=INITIAL_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 increase=RATE_INCREASE, decrease=RATE_DECREASE, throttle_pause=THROTTLE_PAUSE):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.throttle_pause = throttle_pause
+        self.successes = 0
+        self.throttles = 0
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = asyncio.Lock()
+
+    # Wait until the next request slot is available
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_slot, self._paused_until)
+            self._next_slot = start + 1.0 / self.rate
+        delay = start - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # Additive increase after a successful request
+    def record_success(self):
+        self.successes += 1
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    # Multiplicative decrease after a 429/5xx; honours Retry-After when the server sends one
+    def record_throttle(self, retry_after=None):
+        self.throttles += 1
+        now = asyncio.get_running_loop().time()
+        # Concurrent failures from the same burst only count as one congestion signal
+        if now - self._last_decrease >= 1.0 / self.rate:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._last_decrease = now
+        pause = retry_after if retry_after is not None else self.throttle_pause
+        self._paused_until = max(self._paused_until, now + pause)
+        self._next_slot = max(self._next_slot, self._paused_until)
+
+
+# Parse a Retry-After header given in seconds; HTTP-date values fall back to the default pause
+def parse_retry_after(headers):
+    value = headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+# Work queue of ids ordered by when they may next be attempted. Each id is tracked from put() until
+# the handler reports it done() or retry() gives up on it, so an id is never queued twice; ids that
+# run out of attempts are collected in `dead` with their last error class. get() returns None once
+# close() was called and every id has been settled.
+class RetryQueue:
+    def __init__(self, rules=RETRY_RULES, max_delay=RETRY_MAX_DELAY):
+        self.rules = rules
+        self.max_delay = max_delay
+        self.heap = []
+        self.order = itertools.count()
+        self.tracked = set()
+        self.attempts = {}
+        self.dead = {}
+        self.unsettled = 0
+        self.retries = 0
+        self.closed = False
+        self.wakeup = asyncio.Event()
+
+    # Queue an id for its first attempt; `first` puts it ahead of every id queued normally
+    def put(self, item, first=False):
+        if item in self.tracked:
+            return
+        self.tracked.add(item)
+        self.unsettled += 1
+        ready_at = float('-inf') if first else asyncio.get_running_loop().time()
+        heapq.heappush(self.heap, (ready_at, next(self.order), item))
+        self._notify()
+
+    # No ids will be put from now on
+    def close(self):
+        self.closed = True
+        self._notify()
+
+    # Next id whose delay has elapsed, or None when all ids are settled
+    async def get(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.heap and self.heap[0][0] <= loop.time():
+                return heapq.heappop(self.heap)[2]
+            if self.closed and not self.unsettled:
+                return None
+            wakeup = self.wakeup
+            timeout = self.heap[0][0] - loop.time() if self.heap else None
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # Settle an id that needs no further attempts
+    def done(self, item):
+        self.unsettled -= 1
+        self._notify()
+
+    # Schedule another attempt of an id that failed with `error` (a RETRY_RULES class), no sooner than
+    # `min_delay` seconds from now. Returns False, and dead-letters the id, when it is out of attempts.
+    def retry(self, item, error, min_delay=0.0):
+        attempts, base_delay = self.rules[error]
+        self.attempts[item] = self.attempts.get(item, 1) + 1
+        if self.attempts[item] > attempts:
+            self.dead[item] = error
+            self.done(item)
+            return False
+        self.retries += 1
+        delay = max(min_delay, random.uniform(0, min(self.max_delay, base_delay * 2 ** (self.attempts[item] - 2))))
+        heapq.heappush(self.heap, (asyncio.get_running_loop().time() + delay, next(self.order), item))
+        self._notify()
+        return True
+
+    # Attempt number of an id's next try, starting at 0
+    def attempt(self, item):
+        return self.attempts.get(item, 1) - 1
+
+    # Wake every waiting get(); later waiters wait on a fresh event
+    def _notify(self):
+        self.wakeup.set()
+        self.wakeup = asyncio.Event()
+
+
+# Run `handler(item)` for every item on a fixed pool of workers and collect the results. `items` is
+# a list, an asyncio.Queue that is fed while the pool runs and ended by putting None on it, or a
+# RetryQueue. With a RetryQueue the handler settles each item itself and returns None for an attempt
+# that will be retried; only final results are collected and counted.
+async def run_worker_pool(items, handler, concurrency=MAX_CONCURRENCY, desc=None):
+    retrying = isinstance(items, RetryQueue)
+    streaming = isinstance(items, asyncio.Queue)
+    if retrying or streaming:
+        queue = items
+    else:
+        queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+    results = []
+    if retrying:
+        total = len(queue.tracked) if queue.closed else None
+    else:
+        total = None if streaming else queue.qsize()
+    progress = tqdm(total=total, desc=desc)
+
+    async def worker():
+        while True:
+            if retrying:
+                item = await queue.get()
+                if item is None:
+                    return
+            elif streaming:
+                item = await queue.get()
+                if item is None:
+                    # Leave the end marker for the other workers
+                    queue.put_nowait(None)
+                    return
+            else:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+            result = await handler(item)
+            if retrying and result is None:
+                continue
+            results.append(result)
+            progress.update(1)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        progress.close()
+    return results
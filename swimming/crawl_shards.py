@@ -0,0 +1,45 @@
+import os
+import re
+import hashlib
+import argparse
+
+# Per-shard results spools, collected here by the merge stage
+SHARD_DIR = os.getenv('SWIM_SHARD_DIR', 'results_shards')
+
+
+# Parse a `--shard i/N` value into (index, count), with 0 <= index < count
+def parse_shard(spec):
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', spec)
+    if not match:
+        raise argparse.ArgumentTypeError(f"expected a shard as i/N, got {spec!r}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or index >= count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{count - 1}, got {spec!r}")
+    return index, count
+
+
+# Shard an athlete belongs to. A hash of the id (not Python's salted hash()) keeps the
+# assignment stable across processes and runners, and spreads sequential ids evenly.
+def shard_of(swimmer_id, count):
+    digest = hashlib.sha1(str(int(swimmer_id)).encode('ascii')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+def shard_ids(swimmer_ids, index, count):
+    return [swimmer_id for swimmer_id in swimmer_ids if shard_of(swimmer_id, count) == index]
+
+
+def shard_path(index, count, shard_dir=SHARD_DIR):
+    return os.path.join(shard_dir, f'shard-{index}-of-{count}.parquet')
+
+
+# Paths of all `count` shard spools in shard order; fails if any shard is missing so a partial
+# crawl is never published
+def shard_paths(count, shard_dir=SHARD_DIR):
+    if count < 1:
+        raise ValueError(f"shard count must be at least 1, got {count}")
+    paths = [shard_path(index, count, shard_dir) for index in range(count)]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Missing {len(missing)} of {count} result shards: {', '.join(missing)}")
+    return paths
@@ -0,0 +1,840 @@
+import os
+import time
+import asyncio
+import datetime
+import tempfile
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from swimming.run_report import timed
+
+# Database connection details
+host = 'sportsdb-sports-database-for-web-scrapes.g.aivencloud.com'
+port = 16439
+user = 'avnadmin'
+database = 'defaultdb'
+ca_cert_path = 'ca.pem'
+
+# How the tables are refreshed: 'truncate' reloads everything, 'merge' applies only the weekly delta,
+# 'swap' reloads everything into shadow tables and renames them into place in one atomic step
+LOAD_MODES = ('truncate', 'merge', 'swap')
+DEFAULT_LOAD_MODE = os.getenv('SWIM_LOAD_MODE', 'truncate')
+# With 'swap', keep the replaced tables as <table>_previous so rollback_tables() can restore them
+KEEP_PREVIOUS = os.getenv('SWIM_KEEP_PREVIOUS', '0') == '1'
+# Allow a 'merge' load to drop and recreate a populated table that lacks the key columns
+# ('truncate' replaces the data anyway, and 'swap' builds fresh shadow tables)
+RECREATE_OLD_TABLES = os.getenv('SWIM_RECREATE_OLD_TABLES', '0') == '1'
+
+# How each batch is sent: pandas to_sql, LOAD DATA LOCAL INFILE, or executemany prepared inserts.
+# 'load_data' (opt-in) falls back to 'executemany' when the server refuses local infile.
+LOADER_BACKENDS = ('to_sql', 'load_data', 'executemany')
+DEFAULT_LOADER_BACKEND = os.getenv('SWIM_LOADER_BACKEND', 'to_sql')
+# Batches inserted concurrently per table, each on its own pooled connection
+LOADER_WORKERS = int(os.getenv('SWIM_LOADER_WORKERS', 4))
+
+# How results are stored: 'wide' keeps the single denormalised all_swim_results table; 'star'
+# (opt-in, a schema migration) keeps a slim `swim_result` fact table with integer keys into dimension
+# tables, and replaces all_swim_results with a view of the original columns
+RESULT_LAYOUTS = ('star', 'wide')
+DEFAULT_RESULT_LAYOUT = os.getenv('SWIM_RESULT_LAYOUT', 'wide')
+
+# Define the CREATE TABLE statements
+create_table_all_swimmer = '''
+CREATE TABLE IF NOT EXISTS all_swimmer (
+    `id` INT NOT NULL,
+    `providerId` VARCHAR(255) NOT NULL,
+    `firstName` VARCHAR(255),
+    `fullName` VARCHAR(255),
+    `nationality` VARCHAR(255),
+    `gender` VARCHAR(50),
+    `disciplines` TEXT,
+    `metadata` TEXT,
+    `lastName` VARCHAR(255),
+    `dateOfBirth` DATE,
+    `height` FLOAT,
+    `last_updated` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (`id`, `providerId`)
+)
+'''
+
+# `result_key` is a content hash of the raw API result, so a row keeps its identity between runs
+create_table_all_swim_results = '''
+CREATE TABLE IF NOT EXISTS all_swim_results (
+    `result_key` CHAR(40) NOT NULL PRIMARY KEY,
+    `swimmer_id` VARCHAR(255),
+    `Rank` FLOAT,
+    `MedalTag` VARCHAR(255),
+    `SportCode` VARCHAR(255),
+    `DisciplineName` VARCHAR(255),
+    `PhaseName` VARCHAR(255),
+    `RecordType` VARCHAR(255),
+    `NAT` VARCHAR(255),
+    `CompetitionName` VARCHAR(255),
+    `CompetitionType` VARCHAR(255),
+    `CompetitionCountry` VARCHAR(255),
+    `CompetitionCity` VARCHAR(255),
+    `Date` DATE,
+    `Time` VARCHAR(255),
+    `Tags` VARCHAR(255),
+    `AthleteResultAge` FLOAT,
+    `Points` FLOAT,
+    `UtcDateTime` VARCHAR(255),
+    `ClubName` VARCHAR(255),
+    `Score` VARCHAR(255),
+    `MatchName` VARCHAR(255),
+    `TeamHome` VARCHAR(255),
+    `TeamAway` VARCHAR(255),
+    `TeamHomeCode` VARCHAR(255),
+    `TeamAwayCode` VARCHAR(255),
+    `FinalScoreHome` VARCHAR(255),
+    `FinalScoreAway` VARCHAR(255),
+    `last_updated` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+'''
+
+# Dimension tables of the star layout. `natural_key` is the sha1 of the dimension's source values
+# (NULLs stored as ''), so lookups never depend on collation and wide keys stay indexable.
+create_table_dim_event = '''
+CREATE TABLE IF NOT EXISTS dim_event (
+    `event_id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    `natural_key` CHAR(40) NOT NULL,
+    `SportCode` VARCHAR(255) NOT NULL DEFAULT '',
+    `DisciplineName` VARCHAR(255) NOT NULL DEFAULT '',
+    UNIQUE KEY `uq_dim_event_natural_key` (`natural_key`)
+)
+'''
+
+create_table_dim_competition = '''
+CREATE TABLE IF NOT EXISTS dim_competition (
+    `competition_id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    `natural_key` CHAR(40) NOT NULL,
+    `CompetitionName` VARCHAR(255) NOT NULL DEFAULT '',
+    `CompetitionType` VARCHAR(255) NOT NULL DEFAULT '',
+    `CompetitionCountry` VARCHAR(255) NOT NULL DEFAULT '',
+    `CompetitionCity` VARCHAR(255) NOT NULL DEFAULT '',
+    UNIQUE KEY `uq_dim_competition_natural_key` (`natural_key`)
+)
+'''
+
+create_table_dim_phase = '''
+CREATE TABLE IF NOT EXISTS dim_phase (
+    `phase_id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    `natural_key` CHAR(40) NOT NULL,
+    `PhaseName` VARCHAR(255) NOT NULL DEFAULT '',
+    UNIQUE KEY `uq_dim_phase_natural_key` (`natural_key`)
+)
+'''
+
+create_table_dim_country = '''
+CREATE TABLE IF NOT EXISTS dim_country (
+    `country_id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    `natural_key` CHAR(40) NOT NULL,
+    `code` VARCHAR(255) NOT NULL DEFAULT '',
+    UNIQUE KEY `uq_dim_country_natural_key` (`natural_key`)
+)
+'''
+
+# Fact table of the star layout: one row per result, dimensions replaced by their integer ids
+create_table_swim_result = '''
+CREATE TABLE IF NOT EXISTS swim_result (
+    `result_key` CHAR(40) NOT NULL PRIMARY KEY,
+    `swimmer_id` INT NOT NULL,
+    `event_id` INT NOT NULL,
+    `competition_id` INT NOT NULL,
+    `phase_id` INT NOT NULL,
+    `nat_country_id` INT NOT NULL,
+    `Rank` FLOAT,
+    `MedalTag` VARCHAR(255),
+    `RecordType` VARCHAR(255),
+    `Date` DATE,
+    `Time` VARCHAR(255),
+    `Tags` VARCHAR(255),
+    `AthleteResultAge` FLOAT,
+    `Points` FLOAT,
+    `UtcDateTime` VARCHAR(255),
+    `ClubName` VARCHAR(255),
+    `Score` VARCHAR(255),
+    `MatchName` VARCHAR(255),
+    `TeamHome` VARCHAR(255),
+    `TeamAway` VARCHAR(255),
+    `TeamHomeCode` VARCHAR(255),
+    `TeamAwayCode` VARCHAR(255),
+    `FinalScoreHome` VARCHAR(255),
+    `FinalScoreAway` VARCHAR(255),
+    `last_updated` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+'''
+
+# Every dimension: (table, id column, fact column, [(dimension column, all_swim_results column), ...])
+result_dimensions = [
+    ('dim_event', 'event_id', 'event_id', [('SportCode', 'SportCode'), ('DisciplineName', 'DisciplineName')]),
+    ('dim_competition', 'competition_id', 'competition_id', [
+        ('CompetitionName', 'CompetitionName'), ('CompetitionType', 'CompetitionType'),
+        ('CompetitionCountry', 'CompetitionCountry'), ('CompetitionCity', 'CompetitionCity'),
+    ]),
+    ('dim_phase', 'phase_id', 'phase_id', [('PhaseName', 'PhaseName')]),
+    ('dim_country', 'country_id', 'nat_country_id', [('code', 'NAT')]),
+]
+dimension_tables = [
+    ('dim_event', create_table_dim_event),
+    ('dim_competition', create_table_dim_competition),
+    ('dim_phase', create_table_dim_phase),
+    ('dim_country', create_table_dim_country),
+]
+
+# Secondary indexes of the results tables for lookups by swimmer, date and event. They are kept
+# off staging tables and dropped around truncate-and-reload, then built once after the bulk load.
+result_indexes = {
+    'swim_result': [
+        ('idx_swim_result_swimmer_date', ('swimmer_id', 'Date')),
+        ('idx_swim_result_event_date', ('event_id', 'Date')),
+        ('idx_swim_result_competition', ('competition_id',)),
+    ],
+    'all_swim_results': [
+        ('idx_all_swim_results_swimmer_date', ('swimmer_id', 'Date')),
+        ('idx_all_swim_results_discipline_date', ('DisciplineName', 'Date')),
+    ],
+}
+
+# Optional RANGE partitioning of the results table by result year, one partition per year from
+# SWIM_PARTITION_FIRST_YEAR (earlier and undated results share `p_before`). MySQL needs the
+# partitioning column in every unique key, so a stored `result_year` column joins the primary key.
+PARTITION_BY_YEAR = os.getenv('SWIM_PARTITION_BY_YEAR', '0') == '1'
+PARTITION_FIRST_YEAR = int(os.getenv('SWIM_PARTITION_FIRST_YEAR', 1990))
+
+# Primary key columns used to match rows when merging
+all_swimmer_key = ('id', 'providerId')
+all_swim_results_key = ('result_key',)
+swim_result_key = ('result_key',)
+
+
+# SQLAlchemy's text(), imported on first use like the loader's other heavy dependencies (pandas,
+# pymysql, the results schema), so reading this module's settings stays cheap
+def text(sql):
+    from sqlalchemy import text as sql_text
+    return sql_text(sql)
+
+
+# Create SQLAlchemy engine. The pool holds one connection per insert worker plus one for DDL and merge
+# statements, with room for a second table loading at the same time (the 'swap' mode). A streamed load
+# can sit idle while the crawl produces its next batch, so connections are pinged before reuse.
+# Local infile, which lets the server request files from the client, is only enabled for the
+# 'load_data' backend.
+def create_db_engine(backend=None):
+    from sqlalchemy import create_engine
+    password = os.getenv('DB_PASSWORD')
+    connect_args = {'ssl': {'ca': ca_cert_path}}
+    if backend == 'load_data':
+        connect_args['local_infile'] = True
+    return create_engine(f'mysql+pymysql://{user}:{password}@{host}:{port}/{database}', connect_args=connect_args,
+                         pool_size=LOADER_WORKERS + 1, max_overflow=LOADER_WORKERS + 1, pool_pre_ping=True, pool_recycle=3600)
+
+
+# Create the table, replacing a copy created with an older layout that lacks the key columns.
+# A populated old copy is only dropped when `recreate` allows it: always for a reload, and for a
+# merge only with SWIM_RECREATE_OLD_TABLES=1, since a merge means to keep the existing rows.
+def ensure_table(connection, table_name, create_table_query, key_columns, recreate=RECREATE_OLD_TABLES):
+    existing = {row[0] for row in connection.execute(text(
+        'SELECT COLUMN_NAME FROM information_schema.COLUMNS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name'
+    ), {'table_name': table_name})}
+    if existing and not set(key_columns) <= existing:
+        populated = connection.execute(text(f'SELECT 1 FROM {table_name} LIMIT 1')).first() is not None
+        if populated and not recreate:
+            raise RuntimeError(f"Table {table_name} predates key columns {key_columns} and holds data; "
+                               f"set SWIM_RECREATE_OLD_TABLES=1 to drop and recreate it")
+        print(f"Table {table_name} predates key columns {key_columns}; recreating it.")
+        connection.execute(text(f'DROP TABLE {table_name}'))
+    connection.execute(text(create_table_query))
+
+
+# Names of the indexes that exist on a table
+def existing_indexes(connection, table_name):
+    return {row[0] for row in connection.execute(text(
+        'SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name'
+    ), {'table_name': table_name})}
+
+
+def drop_secondary_indexes(connection, table_name, indexes):
+    present = existing_indexes(connection, table_name)
+    drops = [f'DROP INDEX `{name}`' for name, _ in indexes if name in present]
+    if drops:
+        connection.execute(text(f'ALTER TABLE {table_name} {", ".join(drops)}'))
+
+
+# Build every missing index in a single ALTER TABLE, so the table is rebuilt at most once
+def create_secondary_indexes(connection, table_name, indexes):
+    present = existing_indexes(connection, table_name)
+    adds = [f'ADD INDEX `{name}` ({", ".join(f"`{column}`" for column in columns)})'
+            for name, columns in indexes if name not in present]
+    if adds:
+        started = time.perf_counter()
+        connection.execute(text(f'ALTER TABLE {table_name} {", ".join(adds)}'))
+        print(f'{table_name}: built {len(adds)} indexes in {time.perf_counter() - started:.1f}s.')
+
+
+# Partition the results table by year, or add partitions for years that have started since;
+# tables that are already partitioned keep their layout and only grow new years
+def ensure_year_partitioning(connection, table_name, first_year=PARTITION_FIRST_YEAR):
+    last_year = datetime.date.today().year + 1
+    partitions = {row[0] for row in connection.execute(text(
+        'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND PARTITION_NAME IS NOT NULL'
+    ), {'table_name': table_name})}
+    if not partitions:
+        print(f"Partitioning {table_name} by year ({first_year}-{last_year})...")
+        columns = {row[0] for row in connection.execute(text(
+            'SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name'
+        ), {'table_name': table_name})}
+        if 'result_year' not in columns:
+            connection.execute(text(
+                f'ALTER TABLE {table_name} '
+                f'ADD COLUMN `result_year` SMALLINT AS (COALESCE(YEAR(`Date`), 0)) STORED NOT NULL, '
+                f'DROP PRIMARY KEY, ADD PRIMARY KEY (`result_key`, `result_year`)'
+            ))
+        years = [f'PARTITION p{year} VALUES LESS THAN ({year + 1})' for year in range(first_year, last_year + 1)]
+        connection.execute(text(
+            f'ALTER TABLE {table_name} PARTITION BY RANGE (`result_year`) ('
+            f'PARTITION p_before VALUES LESS THAN ({first_year}), {", ".join(years)}, '
+            f'PARTITION p_future VALUES LESS THAN MAXVALUE)'
+        ))
+        return
+    covered = max((int(name[1:]) for name in partitions if name[1:].isdigit()), default=first_year - 1)
+    if covered < last_year:
+        years = [f'PARTITION p{year} VALUES LESS THAN ({year + 1})' for year in range(covered + 1, last_year + 1)]
+        print(f"Adding {len(years)} year partitions to {table_name}.")
+        connection.execute(text(
+            f'ALTER TABLE {table_name} REORGANIZE PARTITION p_future INTO ('
+            f'{", ".join(years)}, PARTITION p_future VALUES LESS THAN MAXVALUE)'
+        ))
+
+
+# Render a batch as MySQL's default LOAD DATA text format: tab separated, backslash escaped, \N for NULL
+def to_tsv(df):
+    columns = []
+    for column in df.columns:
+        values = df[column]
+        rendered = (values.astype(str)
+                    .str.replace('\\', '\\\\', regex=False)
+                    .str.replace('\t', '\\t', regex=False)
+                    .str.replace('\n', '\\n', regex=False)
+                    .str.replace('\r', '\\r', regex=False))
+        columns.append(rendered.mask(values.isna(), '\\N'))
+    lines = columns[0].str.cat(columns[1:], sep='\t') if len(columns) > 1 else columns[0]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+# Insert a batch with LOAD DATA LOCAL INFILE. PyMySQL reads local infiles by path, so the
+# TSV buffer is spooled to a temporary file for the duration of the statement.
+def load_data_batch(engine, df, table_name):
+    column_list = ', '.join(f'`{column}`' for column in df.columns)
+    with tempfile.NamedTemporaryFile(suffix='.tsv') as tsv_file:
+        tsv_file.write(to_tsv(df))
+        tsv_file.flush()
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {table_name} CHARACTER SET utf8mb4 ({column_list})",
+                    (tsv_file.name,)
+                )
+            connection.commit()
+        finally:
+            connection.close()
+
+
+# Insert a batch with a single prepared INSERT executed for every row
+def executemany_batch(engine, df, table_name):
+    column_list = ', '.join(f'`{column}`' for column in df.columns)
+    placeholders = ', '.join(['%s'] * len(df.columns))
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})', list(rows))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+# Insert a batch with pandas to_sql, in one transaction like the other backends
+def to_sql_batch(engine, df, table_name):
+    with engine.begin() as connection:
+        df.to_sql(table_name, con=connection, if_exists='append', index=False)
+
+
+batch_loaders = {
+    'to_sql': to_sql_batch,
+    'load_data': load_data_batch,
+    'executemany': executemany_batch,
+}
+
+
+# Split a DataFrame into batches; iterables of DataFrames (e.g. a streamed spool) pass through
+def frame_batches(data, batch_size):
+    import pandas as pd
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), batch_size):
+            yield data.iloc[start:start + batch_size]
+    else:
+        yield from data
+
+
+# Insert DataFrame batches into an existing table on a small thread pool and report throughput.
+# Every batch is committed in its own transaction. At most two batches per worker are in flight,
+# so a streamed source is never fully materialised and a slow database holds the producer back.
+# Returns the column list of the inserted batches.
+def insert_batches(engine, data, table_name, batch_size=50000, backend=DEFAULT_LOADER_BACKEND, max_workers=LOADER_WORKERS):
+    if backend not in LOADER_BACKENDS:
+        raise ValueError(f"Unknown loader backend {backend!r}; expected one of {LOADER_BACKENDS}")
+    import pymysql
+    from tqdm import tqdm
+    state = {'backend': backend}
+    stats = {}
+    lock = threading.Lock()
+
+    # Function to insert a single batch of data
+    def insert_batch(batch, start):
+        used = state['backend']
+        started = time.perf_counter()
+        try:
+            batch_loaders[used](engine, batch, table_name)
+        except pymysql.err.MySQLError as e:
+            if used != 'load_data':
+                raise
+            print(f"LOAD DATA LOCAL INFILE failed ({e}); falling back to executemany.")
+            state['backend'] = used = 'executemany'
+            started = time.perf_counter()
+            executemany_batch(engine, batch, table_name)
+        elapsed = time.perf_counter() - started
+        with lock:
+            rows, seconds = stats.get(used, (0, 0.0))
+            stats[used] = (rows + len(batch), seconds + elapsed)
+        print(f'Inserted rows {start} to {start + len(batch)} into {table_name}')
+
+    # Insert data in batches with progress bar
+    started = time.perf_counter()
+    total = 0
+    columns = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for batch in tqdm(frame_batches(data, batch_size), desc=f'Inserting into {table_name}', unit='batch'):
+            if not len(batch):
+                continue
+            columns = list(batch.columns)
+            in_flight.append(executor.submit(insert_batch, batch, total))
+            total += len(batch)
+            if len(in_flight) >= 2 * max_workers:
+                in_flight.popleft().result()
+
+        # Wait for the remaining batches to complete
+        while in_flight:
+            in_flight.popleft().result()
+    elapsed = time.perf_counter() - started
+
+    for used, (rows, seconds) in stats.items():
+        print(f'{table_name} [{used}]: {rows} rows, {rows / seconds if seconds else 0:,.0f} rows/s per connection')
+    print(f'{table_name}: {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s overall)')
+    return columns
+
+
+# Function to create table and insert data in batches. Secondary `indexes` are dropped for the
+# reload and rebuilt afterwards; `partition_by_year` partitions the emptied table before the load.
+def create_and_insert_table(engine, data, table_name, create_table_query, key_columns, batch_size=50000, backend=DEFAULT_LOADER_BACKEND,
+                            indexes=(), partition_by_year=False):
+    with engine.begin() as connection:
+        print(f"Creating table {table_name}...")
+        ensure_table(connection, table_name, create_table_query, key_columns, recreate=True)
+
+        # Truncate the table to remove all existing data, before partitioning so the ALTER has no rows to rebuild
+        connection.execute(text(f'TRUNCATE TABLE {table_name}'))
+        drop_secondary_indexes(connection, table_name, indexes)
+        if partition_by_year:
+            ensure_year_partitioning(connection, table_name)
+        print(f"Table {table_name} created and truncated.")
+
+    insert_batches(engine, data, table_name, batch_size, backend)
+    with engine.begin() as connection:
+        create_secondary_indexes(connection, table_name, indexes)
+    print(f'Data inserted successfully for {table_name}.')
+
+
+# Reload a table into `<table>_shadow` while readers keep using the live table: the shadow is created
+# fresh from the DDL, bulk loaded without secondary indexes, then indexed. swap_tables() puts it in place.
+# Returns False when there was nothing to load (and no shadow is left behind).
+def fill_shadow_table(engine, data, table_name, create_table_query, batch_size=50000, backend=DEFAULT_LOADER_BACKEND,
+                      indexes=(), partition_by_year=False):
+    shadow_table = f'{table_name}_shadow'
+    with engine.begin() as connection:
+        print(f"Creating shadow table {shadow_table}...")
+        connection.execute(text(f'DROP TABLE IF EXISTS {shadow_table}'))
+        connection.execute(text(create_table_query.replace(table_name, shadow_table, 1)))
+        if partition_by_year:
+            ensure_year_partitioning(connection, shadow_table)
+
+    if not insert_batches(engine, data, shadow_table, batch_size, backend):
+        print(f"No rows loaded for {table_name}; leaving it unchanged.")
+        with engine.begin() as connection:
+            connection.execute(text(f'DROP TABLE {shadow_table}'))
+        return False
+    with engine.begin() as connection:
+        create_secondary_indexes(connection, shadow_table, indexes)
+    return True
+
+
+# Atomically replace each table with its filled shadow in a single RENAME TABLE. The replaced
+# tables become <table>_previous, which are dropped unless `keep_previous` is set.
+def swap_tables(engine, table_names, keep_previous=KEEP_PREVIOUS):
+    with engine.begin() as connection:
+        renames = []
+        for table_name in table_names:
+            connection.execute(text(f'DROP TABLE IF EXISTS {table_name}_previous'))
+            if table_type(connection, table_name) is not None:
+                renames.append(f'{table_name} TO {table_name}_previous')
+            renames.append(f'{table_name}_shadow TO {table_name}')
+        connection.execute(text(f'RENAME TABLE {", ".join(renames)}'))
+        print(f"Swapped in new {', '.join(table_names)}.")
+        if not keep_previous:
+            for table_name in table_names:
+                connection.execute(text(f'DROP TABLE IF EXISTS {table_name}_previous'))
+
+
+# Swap the generation kept by swap_tables(keep_previous=True) back into place, in one RENAME TABLE;
+# the generation it replaces becomes the new <table>_previous, so a rollback can itself be undone
+def rollback_tables(layout=DEFAULT_RESULT_LAYOUT):
+    table_names = ['all_swimmer', 'swim_result' if layout == 'star' else 'all_swim_results']
+    engine = create_db_engine()
+    with engine.begin() as connection:
+        missing = [f'{table_name}_previous' for table_name in table_names if table_type(connection, f'{table_name}_previous') is None]
+        if missing:
+            raise RuntimeError(f"Nothing to roll back to; missing {', '.join(missing)}")
+        renames = []
+        for table_name in table_names:
+            renames += [f'{table_name} TO {table_name}_rollback', f'{table_name}_previous TO {table_name}',
+                        f'{table_name}_rollback TO {table_name}_previous']
+        connection.execute(text(f'RENAME TABLE {", ".join(renames)}'))
+    print(f"Rolled back {', '.join(table_names)} to the previous generation.")
+
+
+# Load the DataFrame into a staging table and apply only the inserts, updates and deletes
+# needed to make the target table match it. Rows are matched on `key_columns`; rows whose
+# key matches are updated when any of `compare_columns` differs (NULL-safe comparison).
+# `data` is a DataFrame or an iterable of DataFrame batches. The target keeps its secondary
+# `indexes` (the weekly delta is small); the staging copy is loaded without them. With a
+# `scope_column`, only rows whose value in it was staged may be deleted (see apply_merge).
+def merge_table(engine, data, table_name, create_table_query, key_columns, compare_columns=None, batch_size=50000, backend=DEFAULT_LOADER_BACKEND,
+                indexes=(), partition_by_year=False, scope_column=None):
+    staging_table = f'{table_name}_staging'
+    with engine.begin() as connection:
+        print(f"Creating table {table_name} and staging table {staging_table}...")
+        ensure_table(connection, table_name, create_table_query, key_columns)
+        if partition_by_year:
+            ensure_year_partitioning(connection, table_name)
+        create_secondary_indexes(connection, table_name, indexes)
+        connection.execute(text(f'DROP TABLE IF EXISTS {staging_table}'))
+        connection.execute(text(f'CREATE TABLE {staging_table} LIKE {table_name}'))
+        drop_secondary_indexes(connection, staging_table, indexes)
+
+    columns = insert_batches(engine, data, staging_table, batch_size, backend)
+    if not columns:
+        print(f"No rows staged for {table_name}; leaving it unchanged.")
+        with engine.begin() as connection:
+            connection.execute(text(f'DROP TABLE {staging_table}'))
+        return 0, 0, 0
+    if compare_columns is None:
+        compare_columns = [column for column in columns if column not in key_columns]
+    with engine.begin() as connection:
+        return apply_merge(connection, table_name, staging_table, columns, key_columns, compare_columns, scope_column)
+
+
+# Make `table_name` match a filled staging table with one INSERT, UPDATE and DELETE, then drop the staging table.
+# With a `scope_column` (e.g. swimmer_id), the DELETE is limited to rows whose value in it also occurs in
+# the staging table: athletes whose fetch failed this run stage no rows, and keep their published results.
+def apply_merge(connection, table_name, staging_table, columns, key_columns, compare_columns, scope_column=None):
+    column_list = ', '.join(f'`{column}`' for column in columns)
+    join_on = ' AND '.join(f't.`{column}` = s.`{column}`' for column in key_columns)
+    first_key = key_columns[0]
+    inserted = connection.execute(text(
+        f'INSERT INTO {table_name} ({column_list}) '
+        f'SELECT {", ".join(f"s.`{column}`" for column in columns)} FROM {staging_table} s '
+        f'LEFT JOIN {table_name} t ON {join_on} WHERE t.`{first_key}` IS NULL'
+    )).rowcount
+    updated = 0
+    if compare_columns:
+        updated = connection.execute(text(
+            f'UPDATE {table_name} t JOIN {staging_table} s ON {join_on} '
+            f'SET {", ".join(f"t.`{column}` = s.`{column}`" for column in compare_columns)} '
+            f'WHERE NOT ({" AND ".join(f"t.`{column}` <=> s.`{column}`" for column in compare_columns)})'
+        )).rowcount
+    scope = f' AND t.`{scope_column}` IN (SELECT `{scope_column}` FROM {staging_table})' if scope_column else ''
+    deleted = connection.execute(text(
+        f'DELETE t FROM {table_name} t LEFT JOIN {staging_table} s ON {join_on} '
+        f'WHERE s.`{first_key}` IS NULL{scope}'
+    )).rowcount
+    connection.execute(text(f'DROP TABLE {staging_table}'))
+
+    print(f'Merged {table_name}: {inserted} inserted, {updated} updated, {deleted} deleted.')
+    return inserted, updated, deleted
+
+
+# 'BASE TABLE', 'VIEW', or None when nothing of that name exists
+def table_type(connection, table_name):
+    return connection.execute(text(
+        'SELECT TABLE_TYPE FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name'
+    ), {'table_name': table_name}).scalar()
+
+
+# SQL for a dimension's natural key, computed from the wide columns of table alias `alias`
+def natural_key_sql(alias, columns):
+    parts = ', '.join(f"COALESCE({alias}.`{source}`, '')" for _, source in columns)
+    return f'SHA1(CONCAT_WS(CHAR(31), {parts}))'
+
+
+# Add the dimension rows that the loaded wide results reference but the dimension lacks
+def upsert_dimensions(connection, load_table):
+    for table, id_column, _, columns in result_dimensions:
+        dimension_columns = ', '.join(f'`{column}`' for column, _ in columns)
+        values = ', '.join(f"COALESCE(s.`{source}`, '') AS `{column}`" for column, source in columns)
+        added = connection.execute(text(
+            f'INSERT INTO {table} (`natural_key`, {dimension_columns}) '
+            f'SELECT k.`natural_key`, {", ".join(f"k.`{column}`" for column, _ in columns)} FROM ('
+            f'SELECT DISTINCT {natural_key_sql("s", columns)} AS `natural_key`, {values} FROM {load_table} s'
+            f') k LEFT JOIN {table} d ON d.`natural_key` = k.`natural_key` WHERE d.`{id_column}` IS NULL'
+        )).rowcount
+        print(f'{table}: {added} new rows.')
+
+
+# Columns of swim_result in insert order, and the SELECT that builds them from the wide load table
+def fact_select_sql(load_table):
+    from swimming.results_transform import RESULT_COLUMNS
+    dimension_sources = {source for _, _, _, columns in result_dimensions for _, source in columns}
+    value_columns = [column for column in RESULT_COLUMNS if column not in dimension_sources and column not in ('result_key', 'swimmer_id')]
+    columns = ['result_key', 'swimmer_id'] + [fact_column for _, _, fact_column, _ in result_dimensions] + value_columns
+    expressions = ['s.`result_key`', 'CAST(s.`swimmer_id` AS SIGNED)']
+    joins = []
+    for index, (table, id_column, _, dimension_columns) in enumerate(result_dimensions):
+        alias = f'd{index}'
+        expressions.append(f'{alias}.`{id_column}`')
+        joins.append(f'JOIN {table} {alias} ON {alias}.`natural_key` = {natural_key_sql("s", dimension_columns)}')
+    expressions += [f's.`{column}`' for column in value_columns]
+    return columns, f'SELECT {", ".join(expressions)} FROM {load_table} s {" ".join(joins)}'
+
+
+# Replace all_swim_results with a view that joins the star tables back into the original columns.
+# A wide all_swim_results table is kept as all_swim_results_wide_previous until the view is verified
+# (replacing an older copy from an earlier migration).
+def create_results_view(connection):
+    from swimming.results_transform import RESULT_COLUMNS
+    if table_type(connection, 'all_swim_results') == 'BASE TABLE':
+        print("Replacing the wide all_swim_results table with a view over swim_result; "
+              "the table is kept as all_swim_results_wide_previous.")
+        connection.execute(text('DROP TABLE IF EXISTS all_swim_results_wide_previous'))
+        connection.execute(text('RENAME TABLE all_swim_results TO all_swim_results_wide_previous'))
+    sources = {}
+    joins = []
+    for index, (table, id_column, fact_column, columns) in enumerate(result_dimensions):
+        alias = f'd{index}'
+        joins.append(f'JOIN {table} {alias} ON {alias}.`{id_column}` = f.`{fact_column}`')
+        for column, source in columns:
+            sources[source] = f"NULLIF({alias}.`{column}`, '') AS `{source}`"
+    select = [sources.get(column, f'f.`{column}`') for column in RESULT_COLUMNS] + ['f.`last_updated`']
+    connection.execute(text(
+        f'CREATE OR REPLACE VIEW all_swim_results AS SELECT {", ".join(select)} FROM swim_result f {" ".join(joins)}'
+    ))
+
+
+# Load results into the star layout: the wide batches go to a load table, new dimension rows are
+# added from it, and swim_result is rebuilt ('truncate') or merged ('merge') from a server-side join.
+# Secondary indexes are built after a rebuild and kept off the merge staging table. With 'swap' the
+# fact rows go to swim_result_shadow for load_tables to swap in. Returns False when nothing was loaded.
+def load_star_results(engine, data, mode, batch_size=50000, backend=DEFAULT_LOADER_BACKEND, partition_by_year=False):
+    load_table = 'all_swim_results_load'
+    indexes = result_indexes['swim_result']
+    target_table = 'swim_result_shadow' if mode == 'swap' else 'swim_result'
+    with engine.begin() as connection:
+        print(f"Creating star tables and load table {load_table}...")
+        for _, create_table_query in dimension_tables:
+            connection.execute(text(create_table_query))
+        if mode == 'swap':
+            connection.execute(text(f'DROP TABLE IF EXISTS {target_table}'))
+            connection.execute(text(create_table_swim_result.replace('swim_result', target_table, 1)))
+        else:
+            ensure_table(connection, target_table, create_table_swim_result, swim_result_key, recreate=mode == 'truncate' or RECREATE_OLD_TABLES)
+        # A truncate load partitions swim_result once it has been emptied, so existing rows are not rebuilt
+        if partition_by_year and mode != 'truncate':
+            ensure_year_partitioning(connection, target_table)
+        connection.execute(text(f'DROP TABLE IF EXISTS {load_table}'))
+        connection.execute(text(create_table_all_swim_results.replace('all_swim_results', load_table, 1)))
+
+    if not insert_batches(engine, data, load_table, batch_size, backend):
+        print("No results loaded; leaving swim_result unchanged.")
+        with engine.begin() as connection:
+            connection.execute(text(f'DROP TABLE {load_table}'))
+            if mode == 'swap':
+                connection.execute(text(f'DROP TABLE {target_table}'))
+        return False
+
+    columns, select = fact_select_sql(load_table)
+    column_list = ', '.join(f'`{column}`' for column in columns)
+    with engine.begin() as connection:
+        upsert_dimensions(connection, load_table)
+        if mode == 'swap':
+            inserted = connection.execute(text(f'INSERT INTO {target_table} ({column_list}) {select}')).rowcount
+            print(f'Loaded {target_table}: {inserted} rows.')
+            create_secondary_indexes(connection, target_table, indexes)
+            connection.execute(text(f'DROP TABLE {load_table}'))
+            return True
+        if mode == 'truncate':
+            connection.execute(text('TRUNCATE TABLE swim_result'))
+            drop_secondary_indexes(connection, 'swim_result', indexes)
+            if partition_by_year:
+                ensure_year_partitioning(connection, 'swim_result')
+            inserted = connection.execute(text(f'INSERT INTO swim_result ({column_list}) {select}')).rowcount
+            print(f'Reloaded swim_result: {inserted} rows.')
+        else:
+            create_secondary_indexes(connection, 'swim_result', indexes)
+            connection.execute(text('DROP TABLE IF EXISTS swim_result_staging'))
+            connection.execute(text('CREATE TABLE swim_result_staging LIKE swim_result'))
+            drop_secondary_indexes(connection, 'swim_result_staging', indexes)
+            connection.execute(text(f'INSERT INTO swim_result_staging ({column_list}) {select}'))
+            # The result key is a hash of the whole row and dimension ids never change, so matching keys never need an update;
+            # deletes are limited to athletes fetched this run, so a failed fetch never deletes published results
+            apply_merge(connection, 'swim_result', 'swim_result_staging', columns, swim_result_key, (), 'swimmer_id')
+        create_secondary_indexes(connection, 'swim_result', indexes)
+        connection.execute(text(f'DROP TABLE {load_table}'))
+        create_results_view(connection)
+    return True
+
+
+# Refresh both tables using the requested load mode and results layout.
+# `results_data` is a DataFrame or an iterable of DataFrame batches already free of duplicate keys.
+# Results are loaded before swimmers, so `swimmers_df` may also be a callable that returns the
+# DataFrame once it is available (e.g. when results stream in while the roster is still crawling).
+def load_tables(swimmers_df, results_data, mode=DEFAULT_LOAD_MODE, backend=DEFAULT_LOADER_BACKEND, report=None, layout=DEFAULT_RESULT_LAYOUT,
+                partition_by_year=PARTITION_BY_YEAR, keep_previous=KEEP_PREVIOUS):
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode {mode!r}; expected one of {LOAD_MODES}")
+    if layout not in RESULT_LAYOUTS:
+        raise ValueError(f"Unknown results layout {layout!r}; expected one of {RESULT_LAYOUTS}")
+    import pandas as pd
+    engine = create_db_engine(backend)
+    if isinstance(results_data, pd.DataFrame):
+        results_data = results_data.drop_duplicates(subset=list(all_swim_results_key))
+    swimmers = swimmers_df if callable(swimmers_df) else lambda: swimmers_df
+    if layout == 'wide':
+        with engine.begin() as connection:
+            if table_type(connection, 'all_swim_results') == 'VIEW':
+                connection.execute(text('DROP VIEW all_swim_results'))
+    if mode == 'swap':
+        swap_loaded_tables(engine, swimmers, results_data, backend, report, layout, partition_by_year, keep_previous)
+        print('Data inserted successfully for all tables.')
+        return
+
+    if layout == 'star':
+        with timed(report, 'db_insert_swim_result'):
+            load_star_results(engine, results_data, mode, backend=backend, partition_by_year=partition_by_year)
+    else:
+        with timed(report, 'db_insert_all_swim_results'):
+            if mode == 'merge':
+                # The result key is a hash of the whole row, so matching keys never need an update; only the
+                # athletes fetched this run can lose rows, so a failed fetch never deletes published results
+                merge_table(engine, results_data, 'all_swim_results', create_table_all_swim_results, all_swim_results_key, compare_columns=(), backend=backend,
+                            indexes=result_indexes['all_swim_results'], partition_by_year=partition_by_year, scope_column='swimmer_id')
+            else:
+                create_and_insert_table(engine, results_data, 'all_swim_results', create_table_all_swim_results, all_swim_results_key, backend=backend,
+                                        indexes=result_indexes['all_swim_results'], partition_by_year=partition_by_year)
+
+    with timed(report, 'db_insert_all_swimmer'):
+        if mode == 'merge':
+            merge_table(engine, swimmers(), 'all_swimmer', create_table_all_swimmer, all_swimmer_key, backend=backend)
+        else:
+            create_and_insert_table(engine, swimmers(), 'all_swimmer', create_table_all_swimmer, all_swimmer_key, backend=backend)
+    print('Data inserted successfully for all tables.')
+
+
+# 'swap' load: fill the swimmer and results shadow tables concurrently, then swap both in at once.
+# `swimmers` is a callable returning the swimmers DataFrame.
+def swap_loaded_tables(engine, swimmers, results_data, backend, report, layout, partition_by_year, keep_previous):
+    def fill_swimmers():
+        with timed(report, 'db_insert_all_swimmer'):
+            return fill_shadow_table(engine, swimmers(), 'all_swimmer', create_table_all_swimmer, backend=backend)
+
+    def fill_results():
+        if layout == 'star':
+            with timed(report, 'db_insert_swim_result'):
+                return load_star_results(engine, results_data, 'swap', backend=backend, partition_by_year=partition_by_year)
+        with timed(report, 'db_insert_all_swim_results'):
+            return fill_shadow_table(engine, results_data, 'all_swim_results', create_table_all_swim_results, backend=backend,
+                                     indexes=result_indexes['all_swim_results'], partition_by_year=partition_by_year)
+
+    results_table = 'swim_result' if layout == 'star' else 'all_swim_results'
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        swimmers_future = executor.submit(fill_swimmers)
+        results_future = executor.submit(fill_results)
+        filled = [table_name for table_name, future in (('all_swimmer', swimmers_future), (results_table, results_future)) if future.result()]
+    if filled:
+        swap_tables(engine, filled, keep_previous)
+    if layout == 'star' and results_table in filled:
+        with engine.begin() as connection:
+            create_results_view(connection)
+
+
+# How many flushed result batches may wait for the database before the crawl blocks
+LOADER_QUEUE_BATCHES = int(os.getenv('SWIM_LOADER_QUEUE_BATCHES', 4))
+_ABORT = object()
+
+
+# load_tables on a background thread, fed with result batches (Arrow tables) while the crawl is
+# still running. put() blocks while `max_batches` batches are already waiting, so a slow database
+# slows the crawl down instead of buffering the whole dataset; on the event loop put_async() waits
+# the same way without blocking the loop, so only the coroutines handing over batches are held back. finish() ends the stream, waits for
+# the load to complete and re-raises its error; abort() stops it before anything is applied.
+# If the load fails early, the remaining batches are discarded so the crawl never blocks on it.
+class StreamingLoad:
+    def __init__(self, swimmers_df, report=None, max_batches=LOADER_QUEUE_BATCHES, **load_options):
+        self.batches = queue.Queue(maxsize=max(1, max_batches))
+        self.error = None
+        self.ended = False
+        self.thread = threading.Thread(target=self._run, args=(swimmers_df, report, load_options), name='streaming-load', daemon=True)
+        self.thread.start()
+
+    def _frames(self):
+        while True:
+            table = self.batches.get()
+            if table is None or table is _ABORT:
+                self.ended = True
+                if table is _ABORT:
+                    raise RuntimeError('the crawl failed')
+                return
+            yield table.to_pandas()
+
+    def _run(self, swimmers_df, report, load_options):
+        try:
+            load_tables(swimmers_df, self._frames(), report=report, **load_options)
+        except Exception as e:
+            self.error = e
+            print(f"Database load stopped: {e}")
+        while not self.ended:
+            table = self.batches.get()
+            self.ended = table is None or table is _ABORT
+
+    # Queue one batch for the load; a no-op once the load has stopped
+    def put(self, table):
+        if not self.ended:
+            self.batches.put(table)
+
+    async def put_async(self, table):
+        if not self.ended:
+            await asyncio.get_running_loop().run_in_executor(None, self.batches.put, table)
+
+    def finish(self):
+        self.batches.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def abort(self):
+        self.batches.put(_ABORT)
+        self.thread.join()
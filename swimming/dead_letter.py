@@ -0,0 +1,44 @@
+import os
+import json
+import time
+from swimming.results_cache import CACHE_DIR
+
+
+# Path of a crawl's dead-letter file; each crawl ('results', or one shard of it) keeps its own
+def dead_letter_path(crawler):
+    return os.path.join(CACHE_DIR, f'{crawler}_dead_letter.json')
+
+
+# Ids a crawl gave up on after exhausting their retries, kept between runs so the next run
+# retries them first. Each entry records the last error class, how many runs have failed it,
+# and when. update() rewrites the file atomically: ids attempted this run are replaced by
+# this run's outcome, and ids this run did not reach are kept for the next one.
+class DeadLetters:
+    def __init__(self, crawler):
+        self.path = dead_letter_path(crawler)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as handle:
+                self.entries = {int(entry['id']): entry for entry in json.load(handle)}
+
+    # Ids to retry first, oldest failure first
+    def ids(self):
+        return [swimmer_id for swimmer_id, _ in sorted(self.entries.items(), key=lambda item: item[1]['failed_at'])]
+
+    # Record the outcome of a run: `attempted` ids it settled and `dead` ({id: error class}) those it gave up on.
+    # With `known` (the ids the run was given), entries for ids that are no longer crawled are dropped.
+    def update(self, attempted, dead, known=None):
+        now = time.time()
+        previous = dict(self.entries)
+        for swimmer_id in attempted:
+            self.entries.pop(int(swimmer_id), None)
+        if known is not None:
+            known = {int(swimmer_id) for swimmer_id in known}
+            self.entries = {swimmer_id: entry for swimmer_id, entry in self.entries.items() if swimmer_id in known}
+        for swimmer_id, error in dead.items():
+            runs = previous.get(int(swimmer_id), {}).get('runs', 0) + 1
+            self.entries[int(swimmer_id)] = {'id': int(swimmer_id), 'error': error, 'runs': runs, 'failed_at': now}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.part', 'w') as handle:
+            json.dump(sorted(self.entries.values(), key=lambda entry: entry['id']), handle, indent=2)
+        os.replace(self.path + '.part', self.path)
@@ -0,0 +1,64 @@
+from swimming.db_loader import (DEFAULT_LOAD_MODE, DEFAULT_LOADER_BACKEND, DEFAULT_RESULT_LAYOUT, KEEP_PREVIOUS, LOAD_MODES, LOADER_BACKENDS,
+                                PARTITION_BY_YEAR, RESULT_LAYOUTS, load_tables, rollback_tables)
+from swimming.run_report import RunReport
+
+# Roster the results crawl and the DB load read athletes from
+roster_csv_path = 'all_swimmers.csv'
+
+# Read the roster CSV; returns the de-duplicated swimmers DataFrame and the athlete ids to crawl,
+# each once and in roster order, so no athlete's results are spooled twice
+def read_roster(path=roster_csv_path):
+    import pandas as pd
+    swimmers_df = pd.read_csv(path)
+    swimmer_ids = list(dict.fromkeys(swimmers_df["id"].tolist()))
+    return swimmers_df.drop_duplicates(subset=['id', 'providerId']), swimmer_ids
+
+# Arguments controlling how MySQL is refreshed, shared by the `load`, `results` and `run` subcommands
+def add_load_arguments(parser):
+    parser.add_argument('--load-mode', choices=LOAD_MODES, default=DEFAULT_LOAD_MODE,
+                        help='truncate and reload the tables, merge only the changed rows, or load shadow tables and swap them in '
+                             '(default: %(default)s)')
+    parser.add_argument('--loader', choices=LOADER_BACKENDS, default=DEFAULT_LOADER_BACKEND,
+                        help='how batches are sent to MySQL; rows/s is reported per backend (default: %(default)s)')
+    parser.add_argument('--layout', choices=RESULT_LAYOUTS, default=DEFAULT_RESULT_LAYOUT,
+                        help='store results as a star schema (fact + dimension tables) or one wide table (default: %(default)s)')
+    parser.add_argument('--partition-by-year', action='store_true', default=PARTITION_BY_YEAR,
+                        help='RANGE-partition the results table by result year (also SWIM_PARTITION_BY_YEAR=1)')
+    parser.add_argument('--keep-previous', action='store_true', default=KEEP_PREVIOUS,
+                        help='with --load-mode swap, keep the replaced tables as <table>_previous (also SWIM_KEEP_PREVIOUS=1)')
+    parser.add_argument('--rollback', action='store_true',
+                        help='swap the tables kept by --keep-previous back into place and exit')
+
+# Keyword arguments of load_tables-style entry points from the parsed load arguments
+def load_options_from_args(args):
+    return {'load_mode': args.load_mode, 'loader': args.loader, 'layout': args.layout,
+            'partition_by_year': args.partition_by_year, 'keep_previous': args.keep_previous}
+
+# Reload MySQL from an existing results artifact (a spool or shard Parquet file, or the partitioned
+# Parquet directory; the results spool by default) and the roster CSV, without touching the network
+def main(results_path=None, roster_path=roster_csv_path, load_mode=DEFAULT_LOAD_MODE, loader=DEFAULT_LOADER_BACKEND,
+         layout=DEFAULT_RESULT_LAYOUT, partition_by_year=PARTITION_BY_YEAR, keep_previous=KEEP_PREVIOUS, rollback=False):
+    if rollback:
+        rollback_tables(layout)
+        return
+    from swimming.results_writer import SPOOL_PATH, iter_result_frames
+    report = RunReport('load')
+    try:
+        swimmers_df, _ = read_roster(roster_path)
+        report.count('athletes', len(swimmers_df))
+        load_tables(swimmers_df, iter_result_frames(results_path or SPOOL_PATH), mode=load_mode, backend=loader, report=report, layout=layout,
+                    partition_by_year=partition_by_year, keep_previous=keep_previous)
+    finally:
+        report.write()
+
+# Arguments of the `load` subcommand
+def add_arguments(parser):
+    parser.add_argument('--results',
+                        help='results to load: a spool or shard Parquet file, or the partitioned swimmers_results_parquet/ directory '
+                             '(default: the results spool in the crawl cache)')
+    parser.add_argument('--roster', default=roster_csv_path,
+                        help='roster CSV to load into all_swimmer (default: %(default)s)')
+    add_load_arguments(parser)
+
+def run(args):
+    main(results_path=args.results, roster_path=args.roster, rollback=args.rollback, **load_options_from_args(args))
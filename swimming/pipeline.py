@@ -0,0 +1,95 @@
+import asyncio
+import concurrent.futures
+from swimming import results, roster
+from swimming.crawl_scheduler import AdaptiveRateLimiter
+from swimming.load import add_load_arguments, read_roster
+from swimming.run_report import RunReport
+
+# Roster writer that also hands each page's athlete ids to the results crawl as the page is written.
+# The id queue is unbounded: entries are small and the roster crawl must never wait on the results
+# crawl. close() ends the stream and resolves `roster_done` with the CSV path once it is in place.
+class RosterFeed(roster.RosterWriter):
+    def __init__(self, ids, roster_done, path=roster.roster_csv_path):
+        super().__init__(path)
+        self.ids = ids
+        self.roster_done = roster_done
+
+    def write(self, athletes):
+        super().write(athletes)
+        self.ids.put_nowait([athlete["id"] for athlete in athletes if athlete.get("id") is not None])
+
+    def close(self, commit=True):
+        try:
+            super().close(commit)
+        finally:
+            self.ids.put_nowait(None)
+        if commit and self.rows:
+            self.roster_done.set_result(self.path)
+        else:
+            self.roster_done.set_exception(RuntimeError("the roster crawl produced no athletes"))
+
+# Roster, results and database load running side by side: athlete ids flow from roster pages to
+# the results fetch workers, and flushed result batches flow through a bounded queue into a
+# background load, so the run takes about as long as its slowest stage rather than their sum.
+# all_swimmer is loaded last, from the finished roster CSV. A 'truncate' load would leave the live
+# tables empty for the whole crawl, so that mode still loads once the crawl is over.
+async def run_pipeline(args):
+    from swimming.db_loader import StreamingLoad
+    from swimming.response_store import ResponseStore
+
+    ids = asyncio.Queue()
+    roster_done = concurrent.futures.Future()
+    writer = RosterFeed(ids, roster_done, args.roster)
+    load_options = {'mode': args.load_mode, 'backend': args.loader, 'layout': args.layout,
+                    'partition_by_year': args.partition_by_year, 'keep_previous': args.keep_previous}
+    report = RunReport('results')
+    # One store connection for both crawls, so neither waits on the other's write transaction
+    store = ResponseStore()
+    # and one rate limiter, since both crawls hit the same API: a 429 on either slows both down
+    limiter = AdaptiveRateLimiter()
+    def swimmers():
+        return read_roster(roster_done.result())[0]
+
+    loader = None
+    if not args.skip_db and args.load_mode != 'truncate':
+        loader = StreamingLoad(swimmers, report=report, **load_options)
+    tasks = [
+        asyncio.ensure_future(roster.main(fresh=args.fresh, writer=writer, store=store, limiter=limiter)),
+        asyncio.ensure_future(results.crawl_results(report, ids, swimmers, results.SPOOL_PATH, False, args.skip_db, args.fresh, args.full,
+                                                    None, args.workers, load_options, loader, store,
+                                                    limiter)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the other crawl before the shared store is closed under it
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if loader is not None:
+            loader.abort()
+        raise
+    finally:
+        store.close()
+        report.write()
+
+# Arguments of the `run` subcommand
+def add_arguments(parser):
+    parser.add_argument('--roster', default=roster.roster_csv_path,
+                        help='roster CSV to write and load into all_swimmer (default: %(default)s)')
+    results.add_crawl_arguments(parser)
+    add_load_arguments(parser)
+    roster.add_discipline_argument(parser)
+
+# Full weekly refresh. A replay makes no network calls, so its stages simply run back to back.
+def run(args):
+    if args.rollback:
+        results.rollback_tables(args.layout)
+        return
+    roster.params["discipline"] = args.discipline
+    if args.replay:
+        asyncio.run(roster.main(replay=True, writer=roster.RosterWriter(args.roster)))
+        args.shard = args.merge = None
+        results.run(args)
+        return
+    asyncio.run(run_pipeline(args))
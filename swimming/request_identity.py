@@ -0,0 +1,79 @@
+import os
+import re
+import itertools
+from fake_useragent import UserAgent
+from swimming.response_decoding import ACCEPT_ENCODING
+
+# Identity pool limits, overridable from the environment
+IDENTITY_POOL_SIZE = int(os.getenv('SWIM_IDENTITY_POOL_SIZE', 16))
+# An identity is retired once it has been throttled this many times and on more than this share of its requests
+RETIRE_AFTER_THROTTLES = int(os.getenv('SWIM_RETIRE_AFTER_THROTTLES', 3))
+RETIRE_THROTTLE_RATIO = float(os.getenv('SWIM_RETIRE_THROTTLE_RATIO', 0.2))
+
+PLATFORMS = [('Windows', 'Windows'), ('Macintosh', 'macOS'), ('Linux', 'Linux')]
+
+
+# Browser-like request headers for one Chrome user agent, with client hints that match it
+def build_headers(user_agent):
+    match = re.search(r'Chrome/(\d+)', user_agent)
+    version = match.group(1) if match else '124'
+    platform = next((name for marker, name in PLATFORMS if marker in user_agent), 'Windows')
+    return {
+        "Accept": "*/*",
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "Accept-Language": "en-US,en;q=0.9",
+        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        "Origin": "https://www.worldaquatics.com",
+        "Referer": "https://www.worldaquatics.com/",
+        "Sec-Ch-Ua": f'"Not/A)Brand";v="8", "Chromium";v="{version}", "Google Chrome";v="{version}"',
+        "Sec-Ch-Ua-Mobile": "?0",
+        "Sec-Ch-Ua-Platform": f'"{platform}"',
+        "Sec-Fetch-Dest": "empty",
+        "Sec-Fetch-Mode": "cors",
+        "Sec-Fetch-Site": "same-site",
+        "User-Agent": user_agent,
+    }
+
+
+# One request identity (a fixed header set) and how the API has treated it
+class Identity:
+    def __init__(self, headers):
+        self.headers = headers
+        self.successes = 0
+        self.throttles = 0
+        self.retired = False
+
+    def should_retire(self):
+        requests = self.successes + self.throttles
+        return self.throttles >= RETIRE_AFTER_THROTTLES and self.throttles > RETIRE_THROTTLE_RATIO * requests
+
+
+# Pool of request identities built once at startup and handed out round-robin.
+# The user-agent dataset is loaded a single time; identities the API keeps throttling are
+# retired and replaced with fresh ones.
+class IdentityPool:
+    def __init__(self, size=IDENTITY_POOL_SIZE):
+        self.user_agents = UserAgent()
+        self.identities = [self._new_identity() for _ in range(max(1, size))]
+        self.retired = 0
+        self._cycle = itertools.count()
+
+    def _new_identity(self):
+        return Identity(build_headers(self.user_agents.chrome))
+
+    # Next identity in round-robin order
+    def next(self):
+        return self.identities[next(self._cycle) % len(self.identities)]
+
+    def record_success(self, identity):
+        identity.successes += 1
+
+    def record_throttle(self, identity):
+        identity.throttles += 1
+        if not identity.retired and identity.should_retire():
+            identity.retired = True
+            self.retired += 1
+            self.identities[self.identities.index(identity)] = self._new_identity()
+
+    def summary(self):
+        return f"{len(self.identities)} identities, {self.retired} retired"
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import asyncio
+import zlib
+import brotli
+
+# Faster optional codecs: orjson for parsing, zstandard for `Content-Encoding: zstd`
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Encoded bodies smaller than this are decoded inline even when an executor is available:
+# shipping them to another process costs more than decoding them
+OFFLOAD_MIN_BYTES = int(os.getenv('SWIM_DECODE_OFFLOAD_BYTES', 16 * 1024))
+
+# Encodings we can decode, advertised in Accept-Encoding
+SUPPORTED_ENCODINGS = ['gzip', 'deflate', 'br'] + (['zstd'] if zstandard is not None else [])
+ACCEPT_ENCODING = ', '.join(SUPPORTED_ENCODINGS)
+
+
+def _inflate(body):
+    # `deflate` is meant to be zlib-wrapped, but some servers send a raw deflate stream
+    try:
+        return zlib.decompress(body)
+    except zlib.error:
+        return zlib.decompress(body, -zlib.MAX_WBITS)
+
+
+def _unzstd(body):
+    if zstandard is None:
+        raise ValueError('Response is zstd-encoded but the zstandard package is not installed')
+    return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+
+decoders = {
+    'gzip': lambda body: zlib.decompress(body, 16 + zlib.MAX_WBITS),
+    'x-gzip': lambda body: zlib.decompress(body, 16 + zlib.MAX_WBITS),
+    'deflate': _inflate,
+    'br': brotli.decompress,
+    'zstd': _unzstd,
+    'identity': lambda body: body,
+}
+
+
+# Undo every encoding listed in a Content-Encoding header (applied left to right, so removed right to left)
+def decompress(body, content_encoding):
+    if not content_encoding:
+        return body
+    for encoding in reversed([part.strip().lower() for part in content_encoding.split(',') if part.strip()]):
+        decoder = decoders.get(encoding)
+        if decoder is None:
+            raise ValueError(f'Unsupported Content-Encoding {encoding!r}')
+        body = decoder(body)
+    return body
+
+
+# Parse a JSON document with orjson when it is installed
+def parse_json(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+# Errors raised by decompress()/parse_json() for a corrupt or undecodable body (JSON errors are ValueErrors)
+DECODE_ERRORS = (ValueError, zlib.error, brotli.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+# Per-request decode timings for a crawl; the crawlers run with aiohttp's auto_decompress
+# disabled, so every body passes through here exactly once
+class DecodeStats:
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, seconds, bytes_in, bytes_out):
+        self.requests += 1
+        self.seconds += seconds
+        self.slowest = max(self.slowest, seconds)
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+    def summary(self):
+        mean = self.seconds / self.requests * 1000 if self.requests else 0.0
+        return (f"{self.requests} bodies decoded in {self.seconds:.2f}s "
+                f"(mean {mean:.2f} ms, max {self.slowest * 1000:.2f} ms, "
+                f"{self.bytes_in / 1024 ** 2:.1f} MiB -> {self.bytes_out / 1024 ** 2:.1f} MiB)")
+
+
+# Decompress a body according to its Content-Encoding and record how long it took
+def decode_body(body, content_encoding, stats=None):
+    started = time.perf_counter()
+    decoded = decompress(body, content_encoding)
+    if stats is not None:
+        stats.record(time.perf_counter() - started, len(body), len(decoded))
+    return decoded
+
+
+# Decompress and parse a JSON body, recording the combined time; returns (decoded bytes, data)
+def decode_json(body, content_encoding, stats=None):
+    started = time.perf_counter()
+    decoded = decompress(body, content_encoding)
+    data = parse_json(decoded)
+    if stats is not None:
+        stats.record(time.perf_counter() - started, len(body), len(decoded))
+    return decoded, data
+
+
+# decode_body on an executor (e.g. a process pool) so large bodies do not stall the event loop;
+# small or unencoded bodies are handled inline, without a round trip to the executor
+async def decode_body_async(executor, body, content_encoding, stats=None):
+    if executor is None or not content_encoding or len(body) < OFFLOAD_MIN_BYTES:
+        return decode_body(body, content_encoding, stats)
+    started = time.perf_counter()
+    decoded = await asyncio.get_running_loop().run_in_executor(executor, decompress, body, content_encoding)
+    if stats is not None:
+        stats.record(time.perf_counter() - started, len(body), len(decoded))
+    return decoded
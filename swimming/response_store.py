@@ -0,0 +1,114 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+from urllib.parse import urlencode
+from swimming.results_cache import CACHE_DIR
+
+# Persistent response store shared by the roster and results crawlers
+RESPONSE_DB_PATH = os.path.join(CACHE_DIR, 'responses.sqlite')
+STORE_TTL = float(os.getenv('SWIM_STORE_TTL_DAYS', 30)) * 86400
+STORE_MAX_BYTES = int(os.getenv('SWIM_STORE_MAX_BYTES', 2 * 1024 ** 3))
+COMMIT_EVERY = 1000
+
+
+# Key identifying a GET request: the URL with its query parameters in a stable order
+def request_key(url, params=None):
+    return f'{url}?{urlencode(sorted(params.items()))}' if params else url
+
+
+# Content-addressed, zlib-compressed store of decoded response bodies.
+# `objects` holds each distinct body once, keyed by its sha256; `requests` maps a request key to
+# the body it last returned. Entries older than the TTL are evicted, then the least recently
+# stored bodies until the store fits in the size budget.
+class ResponseStore:
+    def __init__(self, path=RESPONSE_DB_PATH, ttl=STORE_TTL, max_bytes=STORE_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS objects (
+                digest TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        ''')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS requests (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        ''')
+        self.pending = 0
+
+    # Body last stored for a request, or None when missing or older than the TTL
+    def get(self, key):
+        row = self.connection.execute(
+            'SELECT o.data FROM requests r JOIN objects o ON o.digest = r.digest '
+            'WHERE r.key = ? AND r.stored_at >= ?',
+            (key, time.time() - self.ttl)
+        ).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    # Body with the given digest, or None when it has been evicted
+    def get_object(self, digest):
+        row = self.connection.execute('SELECT data FROM objects WHERE digest = ?', (digest,)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    # Store a body for a request and return its digest; identical bodies are stored once
+    def put(self, key, body):
+        digest = hashlib.sha256(body).hexdigest()
+        now = time.time()
+        if not self.connection.execute('SELECT 1 FROM objects WHERE digest = ?', (digest,)).fetchone():
+            data = zlib.compress(body)
+            self.connection.execute(
+                'INSERT INTO objects (digest, data, size, stored_at) VALUES (?, ?, ?, ?)',
+                (digest, data, len(data), now)
+            )
+        self.link(key, digest, now)
+        return digest
+
+    # Point a request at an already stored body and refresh both their ages (e.g. after a 304)
+    def link(self, key, digest, now=None):
+        now = now or time.time()
+        self.connection.execute(
+            'INSERT OR REPLACE INTO requests (key, digest, stored_at) VALUES (?, ?, ?)',
+            (key, digest, now)
+        )
+        self.connection.execute('UPDATE objects SET stored_at = ? WHERE digest = ?', (now, digest))
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    # Drop expired requests, then the oldest bodies beyond the size budget, then unreferenced bodies
+    def evict(self):
+        now = time.time()
+        expired = self.connection.execute('DELETE FROM requests WHERE stored_at < ?', (now - self.ttl,)).rowcount
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+        evicted = 0
+        if total > self.max_bytes:
+            for digest, size in self.connection.execute('SELECT digest, size FROM objects ORDER BY stored_at').fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.connection.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+                total -= size
+                evicted += 1
+            self.connection.execute('DELETE FROM requests WHERE digest NOT IN (SELECT digest FROM objects)')
+        self.connection.execute('DELETE FROM objects WHERE digest NOT IN (SELECT digest FROM requests)')
+        self.commit()
+        if expired or evicted:
+            print(f"Response store: {expired} expired requests and {evicted} bodies evicted ({total / 1024 ** 2:.1f} MiB kept).")
+
+    def commit(self):
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
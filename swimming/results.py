@@ -0,0 +1,420 @@
+import os
+import aiohttp
+import asyncio
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+from swimming.request_identity import IdentityPool
+from swimming.crawl_scheduler import AdaptiveRateLimiter, MAX_CONCURRENCY, RetryQueue, parse_retry_after, run_worker_pool
+from swimming.results_cache import ValidatorStore
+from swimming.response_store import ResponseStore
+from swimming.response_decoding import DECODE_ERRORS, DecodeStats, decode_body_async
+from swimming.crawl_journal import CrawlJournal
+from swimming.dead_letter import DeadLetters
+from swimming.crawl_schedule import CrawlSchedule, schedule_summary
+from swimming.run_report import RunReport, timed
+from swimming.crawl_shards import SHARD_DIR, parse_shard, shard_ids, shard_path, shard_paths
+from swimming.db_loader import (DEFAULT_LOAD_MODE, DEFAULT_LOADER_BACKEND, DEFAULT_RESULT_LAYOUT, KEEP_PREVIOUS, PARTITION_BY_YEAR, StreamingLoad,
+                                load_tables, rollback_tables)
+from swimming.load import add_load_arguments, load_options_from_args, read_roster, roster_csv_path
+from swimming.results_writer import (PARQUET_DIR, SHARD_ARTIFACT_DIR, SPOOL_PATH, PooledResultsSpool, ResultsSpool, iter_result_frames, merge_spools,
+                                     sort_spool, write_results_parquet, write_results_shards, write_results_zip)
+
+# Results endpoint for a single athlete; SWIM_API_BASE points the crawler at another server (e.g. benchmarks/mock_api.py)
+api_base = os.getenv('SWIM_API_BASE', 'https://api.worldaquatics.com')
+results_url = api_base + "/fina/athletes/{}/results"
+
+# Worker processes that decode and flatten payloads off the event loop (0 keeps it all inline),
+# and how many flattened batches may be outstanding before the crawl waits for them
+parse_workers = int(os.getenv('SWIM_PARSE_WORKERS', 0))
+parse_max_pending = int(os.getenv('SWIM_PARSE_MAX_PENDING', 0))
+
+# Timeout of a single results request, in seconds
+request_timeout = float(os.getenv('SWIM_REQUEST_TIMEOUT', 60))
+
+# Asynchronous function to make one attempt at fetching the raw results payload for a single swimmer.
+# Parsing happens later, in bulk, when the spool flushes. Sends conditional headers from the
+# validator store and reuses the stored payload when the server answers 304 or returns a body
+# identical to the one we already have. A failed attempt is returned with its error class (see
+# RETRY_RULES) for the caller's retry queue to reschedule.
+async def fetch_results(session, swimmer_id, limiter, identities, cache, decode_stats, executor=None, attempt=0):
+    url = results_url.format(swimmer_id)
+    entry = cache.get(swimmer_id)
+    identity = identities.next()
+    while True:
+        await limiter.acquire()
+        headers = {**identity.headers, **cache.conditional_headers(entry)}
+        try:
+            async with session.get(url, headers=headers, trace_request_ctx={'attempt': attempt}) as response:
+                if response.status == 304 and entry is not None:
+                    limiter.record_success()
+                    identities.record_success(identity)
+                    body = cache.load_body(url, entry)
+                    if body is not None:
+                        return {"id": swimmer_id, "body": body, "unchanged": True}
+                    # The stored payload was evicted; ask for the full body again
+                    entry = None
+                elif response.status == 200:
+                    limiter.record_success()
+                    identities.record_success(identity)
+                    try:
+                        body = await decode_body_async(executor, await response.read(), response.headers.get('Content-Encoding'), decode_stats)
+                    except DECODE_ERRORS as e:
+                        print(f"Failed to decode results for swimmer ID {swimmer_id}. Error: {e}")
+                        return {"id": swimmer_id, "body": None, "error": "decode"}
+                    etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+                    if cache.body_unchanged(entry, body):
+                        cache.refresh(swimmer_id, url, etag, last_modified, body)
+                        return {"id": swimmer_id, "body": body, "unchanged": True}
+                    cache.put(swimmer_id, url, etag, last_modified, body)
+                    return {"id": swimmer_id, "body": body}
+                elif response.status == 429 or response.status >= 500:
+                    # Slow down the whole crawl, not just this request
+                    limiter.record_throttle(parse_retry_after(response.headers))
+                    print(f"Throttled with status code {response.status}. Lowering request rate to {limiter.rate:.2f}/s and changing identity...")
+                    if response.status == 429:
+                        identities.record_throttle(identity)
+                        return {"id": swimmer_id, "body": None, "error": "throttled"}
+                    return {"id": swimmer_id, "body": None, "error": "server"}
+                else:
+                    print(f"Failed to retrieve results for swimmer ID {swimmer_id} with status code {response.status}.")
+                    return {"id": swimmer_id, "body": None, "error": "not_found" if response.status == 404 else "client"}
+        except asyncio.TimeoutError:
+            print(f"Request timed out for swimmer ID {swimmer_id}.")
+            return {"id": swimmer_id, "body": None, "error": "timeout"}
+        except aiohttp.ClientError as e:
+            print(f"Request failed for swimmer ID {swimmer_id}. Error: {e}")
+            return {"id": swimmer_id, "body": None, "error": "connection"}
+
+# Asynchronous function to fetch all results on a bounded worker pool with adaptive rate control.
+# `swimmer_ids` is a list, or an asyncio.Queue of ids ended by None. Every id goes through a
+# RetryQueue: a failed attempt is rescheduled with jittered backoff under its error class's rule
+# instead of holding a worker, and ids in `retry_first` (last run's dead letters) are tried before
+# the rest. Each athlete's results are appended to the spool and journalled once, when the id is
+# settled, so retries never duplicate records; ids that run out of attempts are written to
+# `dead_letters` for the next run. With an executor, bodies are decoded on it rather than on the
+# loop; request metrics, when given, are collected through aiohttp's tracing hooks. A `limiter`
+# passed in is shared with other crawls of the same API, so a throttle slows them all down.
+# Returns the ids that failed.
+async def fetch_all_results(swimmer_ids, spool, store, journal, identities, dead_letters, executor=None, metrics=None, retry_first=(),
+                            known_ids=None, limiter=None):
+    limiter = limiter or AdaptiveRateLimiter()
+    cache = ValidatorStore(store)
+    decode_stats = DecodeStats()
+    retry_queue = RetryQueue()
+    retry_first = set(retry_first)
+
+    async def feed():
+        while (swimmer_id := await swimmer_ids.get()) is not None:
+            retry_queue.put(swimmer_id, first=swimmer_id in retry_first)
+        retry_queue.close()
+
+    async def fetch_and_spool(swimmer_id):
+        result = await fetch_results(session, swimmer_id, limiter, identities, cache, decode_stats, executor, retry_queue.attempt(swimmer_id))
+        error = result.get("error")
+        if error is not None and retry_queue.retry(swimmer_id, error):
+            return None
+        await spool.append_async(swimmer_id, result["body"])
+        status = "ok" if error is None else "failed"
+        journal.record(swimmer_id, status)
+        if error is None:
+            retry_queue.done(swimmer_id)
+        return {"id": swimmer_id, "status": status}
+
+    try:
+        trace_configs = [metrics.trace_config()] if metrics is not None else []
+        timeout = aiohttp.ClientTimeout(total=request_timeout)
+        async with aiohttp.ClientSession(auto_decompress=False, timeout=timeout, trace_configs=trace_configs) as session:
+            if isinstance(swimmer_ids, asyncio.Queue):
+                outcomes = (await asyncio.gather(
+                    feed(),
+                    run_worker_pool(retry_queue, fetch_and_spool, concurrency=MAX_CONCURRENCY, desc='Fetching results'),
+                ))[1]
+            else:
+                for swimmer_id in swimmer_ids:
+                    retry_queue.put(swimmer_id, first=swimmer_id in retry_first)
+                retry_queue.close()
+                outcomes = await run_worker_pool(retry_queue, fetch_and_spool, concurrency=MAX_CONCURRENCY, desc='Fetching results')
+    finally:
+        cache.close()
+        journal.commit()
+    dead_letters.update(retry_queue.tracked, retry_queue.dead, known_ids)
+    failed_ids = [outcome["id"] for outcome in outcomes if outcome["status"] == "failed"]
+    print(f"Finished at {limiter.rate:.2f} requests/s ({limiter.successes} successes, {limiter.throttles} throttles).")
+    print(f"Retries: {retry_queue.retries} rescheduled; {len(retry_queue.dead)} athletes dead-lettered to {dead_letters.path} "
+          f"({dict(Counter(retry_queue.dead.values()))}).")
+    print(f"Validator cache: {cache.hits} unchanged, {cache.misses} downloaded.")
+    print(f"Request identities: {identities.summary()}.")
+    print(f"Decoding: {decode_stats.summary()}.")
+    return failed_ids
+
+# Rebuild the spool from stored responses without any network calls
+def replay_all_results(swimmer_ids, spool, store):
+    missing_ids = []
+    for swimmer_id in tqdm(swimmer_ids, desc='Replaying results'):
+        body = store.get(results_url.format(swimmer_id))
+        if body is None:
+            missing_ids.append(swimmer_id)
+        spool.append(swimmer_id, body)
+    print(f"Replayed {len(swimmer_ids) - len(missing_ids)} athletes from {store.path}; {len(missing_ids)} not in the store.")
+    return missing_ids
+
+# Serve athletes that are not due for a refresh from their last stored payload. Bodies are looked up
+# through the validator store, which re-links them so they do not age out of the response store
+# between refreshes; returns the ids that have no stored payload and so must be crawled.
+def replay_scheduled_results(swimmer_ids, spool, store):
+    cache = ValidatorStore(store)
+    missing_ids = []
+    try:
+        for swimmer_id in tqdm(swimmer_ids, desc='Reusing stored results'):
+            entry = cache.get(swimmer_id)
+            body = cache.load_body(results_url.format(swimmer_id), entry) if entry is not None else None
+            if body is None:
+                missing_ids.append(swimmer_id)
+            else:
+                spool.append(swimmer_id, body)
+    finally:
+        cache.close()
+    print(f"Reused stored results for {len(swimmer_ids) - len(missing_ids)} athletes that are not due.")
+    return missing_ids
+
+# Replay athletes an interrupted run already completed and return the ids still outstanding
+def resume_from_journal(swimmer_ids, spool, store, journal):
+    completed = journal.completed()
+    if not completed:
+        return swimmer_ids
+    resumable = [swimmer_id for swimmer_id in swimmer_ids if swimmer_id in completed]
+    missing_ids = set(replay_all_results(resumable, spool, store))
+    outstanding = [swimmer_id for swimmer_id in swimmer_ids if swimmer_id not in completed or swimmer_id in missing_ids]
+    print(f"Resuming run {journal.run_id}: {len(outstanding)} of {len(swimmer_ids)} athletes outstanding.")
+    return outstanding
+
+# Route athlete ids that arrive in chunks on `id_chunks` (an asyncio.Queue of id lists ended by None,
+# e.g. one list per roster page) the way crawl_results routes a full list: athletes an interrupted
+# run already completed and athletes not due under `schedule` are served from the store, and the
+# rest are put on `fetch_queue` for the fetch workers, which is ended with None. Ids in `retry_first`
+# (last run's dead letters) are always fetched.
+# Returns (ids seen, number of athletes queued for fetching).
+async def route_streamed_ids(id_chunks, fetch_queue, spool, store, journal, schedule=None, retry_first=()):
+    completed = journal.completed()
+    is_due = schedule.due_checker() if schedule is not None else None
+    cache = ValidatorStore(store)
+    seen = set()
+    queued = 0
+    tiers, due_tiers = Counter(), Counter()
+    try:
+        while (chunk := await id_chunks.get()) is not None:
+            for swimmer_id in chunk:
+                if swimmer_id in seen:
+                    continue
+                seen.add(swimmer_id)
+                url = results_url.format(swimmer_id)
+                body = store.get(url) if swimmer_id in completed else None
+                if body is None and is_due is not None and swimmer_id not in retry_first:
+                    tier, due = is_due(swimmer_id)
+                    tiers[tier] += 1
+                    if due:
+                        due_tiers[tier] += 1
+                    else:
+                        entry = cache.get(swimmer_id)
+                        body = cache.load_body(url, entry) if entry is not None else None
+                if body is not None:
+                    await spool.append_async(swimmer_id, body)
+                else:
+                    await fetch_queue.put(swimmer_id)
+                    queued += 1
+    finally:
+        cache.close()
+        await fetch_queue.put(None)
+    if is_due is not None:
+        print(schedule_summary(tiers, due_tiers))
+    print(f"Routed {len(seen)} streamed athletes: {queued} to fetch, {len(seen) - queued} from the store.")
+    return seen, queued
+
+# Write the zip backup and the Parquet files from a finished spool, then refresh the database tables;
+# `swimmers_df` and `load_options` are passed on to load_tables (so the roster may also be a callable
+# returning it; `load_options` holds mode, backend, layout, ...). With a `loader` (a
+# StreamingLoad fed during the crawl) the database is already loading, and is only waited for.
+def publish_results(spool_path, swimmers_df, skip_db, report=None, load_options=None, loader=None):
+    # Sort first so every artifact comes out byte-identical when the results have not changed
+    with timed(report, 'spool_sort'):
+        sort_spool(spool_path)
+    # Save the results to a zipped CSV file for backup
+    with timed(report, 'zip_write'):
+        write_results_zip(spool_path, 'swimmers_results.zip')
+    print("CSV file compressed into ZIP successfully.")
+    with timed(report, 'shards_write'):
+        changed, removed = write_results_shards(spool_path)
+    print(f"CSV shards written to {SHARD_ARTIFACT_DIR}: {changed} changed, {removed} removed.")
+    with timed(report, 'parquet_write'):
+        changed, removed = write_results_parquet(spool_path)
+    print(f"Partitioned Parquet files written to {PARQUET_DIR}: {changed} changed, {removed} removed.")
+
+    # Refresh the database tables
+    if loader is not None:
+        with timed(report, 'db_load_wait'):
+            loader.finish()
+    elif skip_db:
+        print("Skipping the database load.")
+    else:
+        load_tables(swimmers_df, iter_result_frames(spool_path), report=report, **(load_options or {}))
+
+# Crawl (or replay) the results of `ids` into a spool at `spool_path`, then publish it unless this is a shard.
+# `ids` is a list, or an asyncio.Queue of id lists (ended by None) fed while the crawl runs; a
+# `loader` receives every flushed batch so the database loads during the crawl. A `store` passed in
+# is left open, and a `limiter` is passed on to fetch_all_results.
+async def crawl_results(report, ids, swimmers_df, spool_path, replay, skip_db, fresh, full, shard, workers, load_options, loader=None, store=None,
+                        limiter=None):
+    own_store = store is None
+    store = store or ResponseStore()
+    executor = None
+    if workers > 0 and not replay:
+        # Spawned rather than forked: polars' thread pool does not survive a fork
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        spool = PooledResultsSpool(executor, parse_max_pending or 2 * workers, spool_path, sink=loader)
+        print(f"Decoding and flattening on {workers} worker processes.")
+    else:
+        spool = ResultsSpool(spool_path, sink=loader)
+    journal = None
+    schedule = None
+    try:
+        if replay:
+            with report.stage('results_replay'):
+                replay_all_results(ids, spool, store)
+        else:
+            with report.stage('results_fetch'):
+                journal = CrawlJournal(report.pipeline, fresh=fresh)
+                schedule = CrawlSchedule()
+                identities = IdentityPool()
+                # Athletes the last run gave up on are retried first, whatever the schedule says
+                dead_letters = DeadLetters(report.pipeline)
+                retry_first = set(dead_letters.ids())
+                if retry_first:
+                    print(f"Retrying {len(retry_first)} dead-lettered athletes from the last run first.")
+                if isinstance(ids, asyncio.Queue):
+                    # Route ids as they arrive while the fetch workers drain what is due
+                    fetch_queue = asyncio.Queue(maxsize=2 * MAX_CONCURRENCY)
+                    (seen, crawled), failed_ids = await asyncio.gather(
+                        route_streamed_ids(ids, fetch_queue, spool, store, journal, None if full else schedule, retry_first),
+                        fetch_all_results(fetch_queue, spool, store, journal, identities, dead_letters, executor, report.requests, retry_first,
+                                          limiter=limiter),
+                    )
+                    if not seen:
+                        # Keep the published artifacts when the roster crawl failed
+                        raise RuntimeError("no athletes arrived from the roster crawl")
+                    # Only now is the whole roster known: drop dead letters of athletes no longer on it
+                    dead_letters.update((), {}, seen)
+                    report.count('athletes', len(seen))
+                    report.count('athletes_crawled', crawled)
+                else:
+                    outstanding_ids = resume_from_journal(ids, spool, store, journal)
+                    if not full:
+                        due_ids, skipped_ids = schedule.split([swimmer_id for swimmer_id in outstanding_ids if swimmer_id not in retry_first])
+                        crawl_ids = retry_first | set(due_ids) | set(replay_scheduled_results(skipped_ids, spool, store))
+                        outstanding_ids = [swimmer_id for swimmer_id in outstanding_ids if swimmer_id in crawl_ids]
+                    report.count('athletes', len(ids))
+                    report.count('athletes_crawled', len(outstanding_ids))
+                    failed_ids = await fetch_all_results(outstanding_ids, spool, store, journal, identities, dead_letters, executor, report.requests,
+                                                         retry_first, ids, limiter)
+                report.count('athletes_failed', len(failed_ids))
+                schedule.record_crawled(journal.completed())
+                store.evict()
+    finally:
+        spool.close()
+        if own_store:
+            store.close()
+        else:
+            store.commit()
+        if executor is not None:
+            executor.shutdown()
+        if journal is not None:
+            journal.commit()
+        report.add_stage('flatten', spool.flatten_seconds)
+    print(f"Spooled {spool.rows} results to {spool.path}.")
+    report.count('results', spool.rows)
+    if schedule is not None:
+        schedule.update_activity(spool.path)
+        schedule.close()
+
+    if shard is None:
+        publish_results(spool.path, swimmers_df, skip_db, report, load_options, loader)
+
+    # Everything downstream of the crawl succeeded; the next run starts from scratch
+    if journal is not None:
+        print(f"Run {journal.run_id} outcomes: {journal.summary()}")
+        journal.finish()
+        journal.close()
+
+# Main function to run the asynchronous fetching. With a shard (index, count) only that shard's
+# athletes are crawled into its own spool under SHARD_DIR and nothing is published; `merge=N`
+# combines the N shard spools and publishes them without crawling. Every run writes a run report.
+# A full crawl loads the database while it runs, except in 'truncate' mode, which would leave the
+# live tables empty until the crawl is over and so still loads once it has finished.
+async def main(load_mode=DEFAULT_LOAD_MODE, loader=DEFAULT_LOADER_BACKEND, replay=False, skip_db=False, fresh=False, full=False,
+               shard=None, merge=None, workers=parse_workers, layout=DEFAULT_RESULT_LAYOUT, partition_by_year=PARTITION_BY_YEAR,
+               keep_previous=KEEP_PREVIOUS, rollback=False, roster_path=roster_csv_path):
+    if rollback:
+        rollback_tables(layout)
+        return
+    load_options = {'mode': load_mode, 'backend': loader, 'layout': layout,
+                    'partition_by_year': partition_by_year, 'keep_previous': keep_previous}
+    if merge is not None:
+        report = RunReport('results-merge')
+    elif shard is not None:
+        report = RunReport(f'results-shard-{shard[0]}-of-{shard[1]}')
+    else:
+        report = RunReport('results')
+    try:
+        swimmers_df, swimmer_ids = read_roster(roster_path)
+        if merge is not None:
+            with report.stage('results_merge'):
+                rows = merge_spools(shard_paths(merge))
+            print(f"Merged {merge} shards into {SPOOL_PATH} ({rows} results).")
+            report.count('results', rows)
+            publish_results(SPOOL_PATH, swimmers_df, skip_db, report, load_options)
+        elif shard is not None:
+            ids = shard_ids(swimmer_ids, *shard)
+            print(f"Shard {shard[0]}/{shard[1]}: {len(ids)} of {len(swimmer_ids)} athletes.")
+            await crawl_results(report, ids, swimmers_df, shard_path(*shard), replay, skip_db, fresh, full, shard, workers, load_options)
+        else:
+            loader = None
+            if not skip_db and load_mode != 'truncate':
+                loader = StreamingLoad(swimmers_df, report=report, **load_options)
+            try:
+                await crawl_results(report, swimmer_ids, swimmers_df, SPOOL_PATH, replay, skip_db, fresh, full, None, workers, load_options, loader)
+            except BaseException:
+                if loader is not None:
+                    loader.abort()
+                raise
+    finally:
+        report.write()
+
+# Arguments of the `results` subcommand
+def add_arguments(parser):
+    parser.add_argument('--roster', default=roster_csv_path,
+                        help='roster CSV to read athlete ids from (default: %(default)s)')
+    add_crawl_arguments(parser)
+    sharding = parser.add_mutually_exclusive_group()
+    sharding.add_argument('--shard', type=parse_shard, metavar='I/N',
+                          help=f'crawl only shard I of N (0-based) into {SHARD_DIR}/ and skip the zip, Parquet and DB stages')
+    sharding.add_argument('--merge', type=int, metavar='N',
+                          help=f'combine the N shard spools in {SHARD_DIR}/ and publish them, without crawling')
+    add_load_arguments(parser)
+
+# Crawl options shared by the `results` and `run` subcommands
+def add_crawl_arguments(parser):
+    parser.add_argument('--replay', action='store_true',
+                        help='rebuild the zip, Parquet files and DB load from the response store without network calls')
+    parser.add_argument('--skip-db', action='store_true',
+                        help='write the zip and Parquet artifacts but do not touch MySQL')
+    parser.add_argument('--fresh', action='store_true',
+                        help='ignore an interrupted run in the checkpoint journal instead of resuming it')
+    parser.add_argument('--full', action='store_true',
+                        help='crawl every athlete instead of only those due under the activity-tier schedule')
+    parser.add_argument('--workers', type=int, default=parse_workers,
+                        help='decode and flatten payloads on this many worker processes; 0 keeps them on the event loop (default: %(default)s)')
+
+def run(args):
+    asyncio.run(main(replay=args.replay, skip_db=args.skip_db, fresh=args.fresh, full=args.full, shard=args.shard, merge=args.merge,
+                     workers=args.workers, rollback=args.rollback, roster_path=args.roster, **load_options_from_args(args)))
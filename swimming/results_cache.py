@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import hashlib
+
+# Location of the persistent crawl state shared between weekly runs
+CACHE_DIR = os.getenv('SWIM_CACHE_DIR', '.swim_cache')
+VALIDATOR_DB_PATH = os.path.join(CACHE_DIR, 'results_validators.sqlite')
+COMMIT_EVERY = 1000
+
+
+# Persistent store of HTTP validators (ETag / Last-Modified) and the digest of the last payload
+# per athlete. The payloads themselves live in the content-addressed ResponseStore, so a 304
+# (or an identical body when the server sends no validators) is answered from disk without
+# re-downloading or storing anything new.
+class ValidatorStore:
+    def __init__(self, store, path=VALIDATOR_DB_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.store = store
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS result_validators (
+                athlete_id INTEGER PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+    # Return the stored (etag, last_modified, body_hash) row for an athlete, if any
+    def get(self, athlete_id):
+        return self.connection.execute(
+            'SELECT etag, last_modified, body_hash FROM result_validators WHERE athlete_id = ?',
+            (int(athlete_id),)
+        ).fetchone()
+
+    # Conditional request headers for a stored entry
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry is None:
+            return headers
+        etag, last_modified = entry[0], entry[1]
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    # True when a freshly downloaded body is byte-identical to the stored payload
+    @staticmethod
+    def body_unchanged(entry, body):
+        return entry is not None and entry[2] == hashlib.sha256(body).hexdigest()
+
+    # Stored payload for an entry, re-linked to `key` in the response store;
+    # None when the response store has evicted it
+    def load_body(self, key, entry):
+        body = self.store.get_object(entry[2])
+        if body is not None:
+            self.store.link(key, entry[2])
+            self.hits += 1
+        return body
+
+    # Record the validators of a 200 response and store its payload under `key`
+    def put(self, athlete_id, key, etag, last_modified, body):
+        self.misses += 1
+        self._save(athlete_id, key, etag, last_modified, body)
+
+    # Record the validators of a 200 response whose body matches the stored payload, so the next
+    # request can be answered with a 304; the payload is only re-linked (or restored if evicted)
+    def refresh(self, athlete_id, key, etag, last_modified, body):
+        self.hits += 1
+        self._save(athlete_id, key, etag, last_modified, body)
+
+    def _save(self, athlete_id, key, etag, last_modified, body):
+        digest = self.store.put(key, body)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO result_validators (athlete_id, etag, last_modified, body_hash) '
+            'VALUES (?, ?, ?, ?)',
+            (int(athlete_id), etag, last_modified, digest)
+        )
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
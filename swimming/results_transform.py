@@ -0,0 +1,82 @@
+import io
+import hashlib
+import polars as pl
+
+# Fields of one entry in an athlete's `Results` array, in all_swim_results order
+RESULT_FIELDS = [
+    'Rank', 'MedalTag', 'SportCode', 'DisciplineName', 'PhaseName', 'RecordType', 'NAT',
+    'CompetitionName', 'CompetitionType', 'CompetitionCountry', 'CompetitionCity', 'Date', 'Time',
+    'Tags', 'AthleteResultAge', 'Points', 'UtcDateTime', 'ClubName', 'Score', 'MatchName',
+    'TeamHome', 'TeamAway', 'TeamHomeCode', 'TeamAwayCode', 'FinalScoreHome', 'FinalScoreAway',
+]
+
+# Explicit types of the flattened frame; fields not listed here stay strings
+RESULT_TYPES = {
+    'Rank': pl.Float64,
+    'AthleteResultAge': pl.Float64,
+    'Points': pl.Float64,
+    'Date': pl.Date,
+}
+RESULT_SCHEMA = {
+    'result_key': pl.String,
+    'swimmer_id': pl.String,
+    **{field: RESULT_TYPES.get(field, pl.String) for field in RESULT_FIELDS},
+}
+RESULT_COLUMNS = list(RESULT_SCHEMA)
+
+# Arrow schema of the frames handed to the writers
+RESULT_ARROW_SCHEMA = pl.DataFrame(schema=RESULT_SCHEMA).to_arrow().schema
+
+# Raw payloads are read with every field as a string, whatever JSON type the API used;
+# typing then happens once, column by column
+_RAW_SCHEMA = {'Results': pl.List(pl.Struct({field: pl.String for field in RESULT_FIELDS}))}
+
+
+def _read_payloads(bodies):
+    return pl.read_json(io.BytesIO(b'[' + b','.join(bodies) + b']'), schema=_RAW_SCHEMA)
+
+
+# Parse raw payloads in one call; a malformed body only drops that athlete
+def _read_all_payloads(swimmer_ids, bodies):
+    try:
+        return swimmer_ids, _read_payloads(bodies)
+    except pl.exceptions.PolarsError:
+        kept_ids, frames = [], []
+        for swimmer_id, body in zip(swimmer_ids, bodies):
+            try:
+                frames.append(_read_payloads([body]))
+                kept_ids.append(swimmer_id)
+            except pl.exceptions.PolarsError as e:
+                print(f"Skipping malformed results payload for swimmer ID {swimmer_id}: {e}")
+        return kept_ids, pl.concat(frames) if frames else pl.DataFrame(schema=_RAW_SCHEMA)
+
+
+def _sha1_hex(identities):
+    sha1 = hashlib.sha1
+    return pl.Series(values=[sha1(identity.encode('utf-8')).hexdigest() for identity in identities.to_list()], dtype=pl.String)
+
+
+# `result_key`: the sha1 of the athlete id and the result's canonical JSON, so a result keeps its
+# identity between runs and library upgrades. The identity column is built by polars and hashed
+# as one batch.
+def result_key_expr():
+    identity = pl.concat_str([pl.col('swimmer_id'), pl.col('Results').struct.json_encode()], separator='|')
+    return identity.map_batches(_sha1_hex, return_dtype=pl.String)
+
+
+# Turn raw `/results` payloads into a typed, de-duplicated frame with the RESULT_SCHEMA columns
+def flatten_results(swimmer_ids, bodies):
+    swimmer_ids, raw = _read_all_payloads(swimmer_ids, bodies)
+    return (
+        raw.with_columns(swimmer_id=pl.Series(values=[str(swimmer_id) for swimmer_id in swimmer_ids], dtype=pl.String))
+        .explode('Results')
+        .drop_nulls('Results')
+        .with_columns(result_key=result_key_expr())
+        .unnest('Results')
+        .with_columns(
+            Date=pl.col('Date').str.slice(0, 10).str.to_date('%Y-%m-%d', strict=False),
+            **{field: pl.col(field).cast(dtype, strict=False) for field, dtype in RESULT_TYPES.items() if field != 'Date'},
+        )
+        .select(RESULT_COLUMNS)
+        .unique(subset='result_key', keep='first', maintain_order=True)
+    )
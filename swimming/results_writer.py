@@ -0,0 +1,313 @@
+import os
+import io
+import json
+import time
+import asyncio
+import hashlib
+import collections
+import shutil
+import tempfile
+import zipfile
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from swimming.results_cache import CACHE_DIR
+from swimming.results_transform import RESULT_ARROW_SCHEMA, RESULT_COLUMNS, flatten_results
+
+# On-disk spool the crawler streams results into, its row group size and how many payload bytes are buffered per flush
+SPOOL_PATH = os.path.join(CACHE_DIR, 'results_spool.parquet')
+FLUSH_ROWS = int(os.getenv('SWIM_FLUSH_ROWS', 50000))
+FLUSH_BYTES = int(os.getenv('SWIM_FLUSH_BYTES', 32 * 1024 * 1024))
+
+# Partitioned Parquet artifact written next to swimmers_results.zip
+PARQUET_DIR = 'swimmers_results_parquet'
+PARTITION_COLUMNS = ['DisciplineName', 'year']
+
+# Sorted CSV shards committed by the workflow: one file per range of SWIM_ARTIFACT_SHARD_IDS athlete ids,
+# so a weekly refresh only rewrites the ranges whose athletes have new results
+SHARD_ARTIFACT_DIR = 'swimmers_results'
+ARTIFACT_SHARD_IDS = int(os.getenv('SWIM_ARTIFACT_SHARD_IDS', 10000))
+# Leading underscore: pyarrow dataset discovery skips it when reading the Parquet directory
+MANIFEST_NAME = '_manifest.json'
+
+# Total order of published rows: by athlete, then date; result_key breaks ties, so the same
+# results always produce byte-identical artifacts whatever order the crawl finished in
+SORT_COLUMNS = ['swimmer_number', 'Date', 'result_key']
+
+# flatten_results plus the seconds it took, measured wherever it runs (possibly a worker process)
+def timed_flatten(swimmer_ids, bodies):
+    started = time.perf_counter()
+    frame = flatten_results(swimmer_ids, bodies)
+    return frame, time.perf_counter() - started
+
+
+# Columnar writer fed with each athlete's raw results payload as it arrives. Payloads are buffered
+# until SWIM_FLUSH_BYTES, flattened and typed in one polars pass, and appended to the Parquet spool
+# as Arrow data, so memory stays flat regardless of crawl size. A `sink`, when given, is also handed
+# every written batch as an Arrow table (e.g. to load the database during the crawl): through
+# `await sink.put_async(table)` on the event loop, so a slow sink holds back only the appending
+# coroutines, and through `sink.put(table)` from the synchronous flush() and close().
+class ResultsSpool:
+    def __init__(self, path=SPOOL_PATH, flush_bytes=FLUSH_BYTES, sink=None):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.sink = sink
+        self.writer = pq.ParquetWriter(path, RESULT_ARROW_SCHEMA, compression='zstd')
+        self.swimmer_ids = []
+        self.bodies = []
+        self.buffered_bytes = 0
+        self.rows = 0
+        self.flatten_seconds = 0.0
+        self.unsent = collections.deque()
+
+    # Buffer one athlete's raw payload (None when the fetch failed); True once the buffer is due a flush
+    def _buffer(self, swimmer_id, body):
+        if body is None:
+            return False
+        self.swimmer_ids.append(swimmer_id)
+        self.bodies.append(body)
+        self.buffered_bytes += len(body)
+        return self.buffered_bytes >= self.flush_bytes
+
+    def append(self, swimmer_id, body):
+        if self._buffer(swimmer_id, body):
+            self.flush()
+
+    # Same as append(), for callers running on the event loop
+    async def append_async(self, swimmer_id, body):
+        if self._buffer(swimmer_id, body):
+            self._write_buffered()
+            await self._send_async()
+
+    def flush(self):
+        self._write_buffered()
+        self._send()
+
+    def _write_buffered(self):
+        if self.bodies:
+            self._write(timed_flatten(self.swimmer_ids, self.bodies))
+            self.swimmer_ids, self.bodies = [], []
+            self.buffered_bytes = 0
+
+    def _write(self, flattened):
+        frame, seconds = flattened
+        table = frame.to_arrow()
+        self.writer.write_table(table, row_group_size=FLUSH_ROWS)
+        self.rows += frame.height
+        self.flatten_seconds += seconds
+        if self.sink is not None and frame.height:
+            self.unsent.append(table)
+
+    def _send(self):
+        while self.unsent:
+            self.sink.put(self.unsent.popleft())
+
+    async def _send_async(self):
+        while self.unsent:
+            await self.sink.put_async(self.unsent.popleft())
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+# Spool that flattens each buffered batch on an executor (normally a process pool) instead of the
+# event loop. At most `max_pending` batches are outstanding: append_async() waits for the oldest
+# one to be written before buffering more, so parse work cannot pile up behind the crawl.
+class PooledResultsSpool(ResultsSpool):
+    def __init__(self, executor, max_pending, path=SPOOL_PATH, flush_bytes=FLUSH_BYTES, sink=None):
+        super().__init__(path, flush_bytes, sink)
+        self.executor = executor
+        self.max_pending = max(1, max_pending)
+        self.pending = collections.deque()
+
+    async def append_async(self, swimmer_id, body):
+        if self._buffer(swimmer_id, body):
+            self.pending.append(self.executor.submit(timed_flatten, self.swimmer_ids, self.bodies))
+            self.swimmer_ids, self.bodies = [], []
+            self.buffered_bytes = 0
+        while self.pending and (len(self.pending) > self.max_pending or self.pending[0].done()):
+            future = self.pending.popleft()
+            self._write(await asyncio.wrap_future(future))
+        await self._send_async()
+
+    # Write every outstanding batch, then flatten what is still buffered
+    def flush(self):
+        while self.pending:
+            self._write(self.pending.popleft().result())
+        super().flush()
+
+
+# Concatenate shard spools, in the order given, into a single spool
+def merge_spools(paths, path=SPOOL_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    rows = 0
+    with pq.ParquetWriter(path, RESULT_ARROW_SCHEMA, compression='zstd') as writer:
+        for shard in paths:
+            for batch in pq.ParquetFile(shard).iter_batches(batch_size=FLUSH_ROWS):
+                writer.write_batch(batch, row_group_size=FLUSH_ROWS)
+                rows += batch.num_rows
+    return rows
+
+
+# Rewrite the spool in SORT_COLUMNS order. polars' streaming engine sorts out of core, so this
+# works on spools larger than memory.
+def sort_spool(path=SPOOL_PATH):
+    sorted_path = path + '.sorted'
+    (
+        pl.scan_parquet(path)
+        .with_columns(swimmer_number=pl.col('swimmer_id').cast(pl.Int64, strict=False))
+        .sort(SORT_COLUMNS, nulls_last=True)
+        .drop('swimmer_number')
+        .sink_parquet(sorted_path, compression='zstd', row_group_size=FLUSH_ROWS)
+    )
+    os.replace(sorted_path, path)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Make `output_dir` match the freshly written `staged_dir`, touching only what changed: files whose
+# content hash differs are moved into place, files that no longer exist are removed and identical
+# files are left alone. Writes a manifest of every file's hash; returns (changed, removed) counts.
+def sync_directory(staged_dir, output_dir):
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as handle:
+            previous = json.load(handle)
+    except (OSError, ValueError):
+        previous = {}
+    manifest, changed = {}, 0
+    for root, _, files in os.walk(staged_dir):
+        for name in files:
+            staged = os.path.join(root, name)
+            relative = os.path.relpath(staged, staged_dir).replace(os.sep, '/')
+            target = os.path.join(output_dir, relative)
+            manifest[relative] = _file_sha256(staged)
+            if previous.get(relative) == manifest[relative] and os.path.exists(target):
+                continue
+            if os.path.exists(target) and _file_sha256(target) == manifest[relative]:
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(staged, target)
+            changed += 1
+    removed = 0
+    for root, _, files in os.walk(output_dir, topdown=False):
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), output_dir).replace(os.sep, '/')
+            if relative != MANIFEST_NAME and relative not in manifest:
+                os.remove(os.path.join(root, name))
+                removed += 1
+        if root != output_dir and not os.listdir(root):
+            os.rmdir(root)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(manifest_path + '.tmp', 'w') as handle:
+        json.dump(dict(sorted(manifest.items())), handle, indent=1)
+        handle.write('\n')
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return changed, removed
+
+
+def _staging_dir(output_dir):
+    return tempfile.mkdtemp(prefix='.staging-', dir=os.path.dirname(os.path.abspath(output_dir)))
+
+
+# Read the spool back as pandas DataFrames of at most `batch_size` rows. `path` may also be a
+# partitioned Parquet artifact written by write_results_parquet.
+def iter_result_frames(path=SPOOL_PATH, batch_size=FLUSH_ROWS):
+    if os.path.isdir(path):
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        for batch in dataset.to_batches(columns=RESULT_COLUMNS, batch_size=batch_size):
+            yield batch.cast(RESULT_ARROW_SCHEMA).to_pandas()
+        return
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        yield batch.to_pandas()
+
+
+# Stream the spool into the zipped CSV backup without materialising the whole dataset. The entry
+# gets a fixed timestamp, so a sorted spool with unchanged results gives a byte-identical zip.
+def write_results_zip(path=SPOOL_PATH, zip_path='swimmers_results.zip', archive_name='swimmers_results.csv'):
+    entry = zipfile.ZipInfo(archive_name, date_time=(1980, 1, 1, 0, 0, 0))
+    entry.compress_type = zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(entry, 'w', force_zip64=True) as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as handle:
+            header = True
+            for frame in iter_result_frames(path):
+                frame.to_csv(handle, index=False, header=header)
+                header = False
+            if header:
+                handle.write(','.join(RESULT_COLUMNS) + '\n')
+
+
+# Spool batch plus the `year` partition column derived from `Date`
+def _with_year(batch):
+    columns = {name: batch.column(name) for name in batch.schema.names}
+    columns['year'] = pc.year(batch.column('Date'))
+    return pa.RecordBatch.from_pydict(columns)
+
+
+# Write the spool as Parquet files partitioned by discipline and year (hive layout, e.g.
+# DisciplineName=Men%20100m%20Freestyle/year=2023/part-0.parquet) with column statistics,
+# so readers can prune partitions and push predicates down instead of parsing the whole CSV.
+# Rows keep the spool order and only partitions whose content changed are rewritten.
+def write_results_parquet(path=SPOOL_PATH, output_dir=PARQUET_DIR):
+    import pyarrow.dataset as ds
+    spool = pq.ParquetFile(path)
+    batches = (_with_year(batch) for batch in spool.iter_batches(batch_size=FLUSH_ROWS))
+    schema = RESULT_ARROW_SCHEMA.append(pa.field('year', pa.int64()))
+    staged_dir = _staging_dir(output_dir)
+    try:
+        ds.write_dataset(
+            batches,
+            staged_dir,
+            schema=schema,
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([schema.field(name) for name in PARTITION_COLUMNS]), flavor='hive'),
+            file_options=ds.ParquetFileFormat().make_write_options(compression='zstd', write_statistics=True),
+            max_rows_per_group=FLUSH_ROWS,
+            existing_data_behavior='overwrite_or_ignore',
+            preserve_order=True,
+        )
+        return sync_directory(staged_dir, output_dir)
+    finally:
+        shutil.rmtree(staged_dir, ignore_errors=True)
+
+
+def _shard_name(shard_ids):
+    start = pl.col('swimmer_id').cast(pl.Int64, strict=False).fill_null(0) // shard_ids * shard_ids
+    return pl.format('results-{}-{}.csv', start.cast(pl.String).str.zfill(8), (start + shard_ids - 1).cast(pl.String).str.zfill(8))
+
+
+# Write the (sorted) spool as plain CSV shards by athlete id range, e.g.
+# swimmers_results/results-01030000-01039999.csv. Plain text keeps git's delta compression
+# effective, and unchanged shards are left untouched. Returns (changed, removed) counts.
+def write_results_shards(path=SPOOL_PATH, output_dir=SHARD_ARTIFACT_DIR, shard_ids=ARTIFACT_SHARD_IDS):
+    staged_dir = _staging_dir(output_dir)
+    handle, current = None, None
+    try:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=FLUSH_ROWS):
+            frame = pl.from_arrow(batch).with_columns(shard=_shard_name(shard_ids))
+            for (name,), rows in frame.partition_by('shard', maintain_order=True, as_dict=True).items():
+                new_shard = not os.path.exists(os.path.join(staged_dir, name))
+                if name != current:
+                    if handle:
+                        handle.close()
+                    handle = open(os.path.join(staged_dir, name), 'ab')
+                    current = name
+                rows.drop('shard').write_csv(handle, include_header=new_shard)
+        if handle:
+            handle.close()
+            handle = None
+        return sync_directory(staged_dir, output_dir)
+    finally:
+        if handle:
+            handle.close()
+        shutil.rmtree(staged_dir, ignore_errors=True)
@@ -0,0 +1,227 @@
+import os
+import aiohttp
+import asyncio
+import csv
+from swimming.request_identity import IdentityPool
+from swimming.crawl_scheduler import AdaptiveRateLimiter, MAX_CONCURRENCY, parse_retry_after, run_worker_pool
+from swimming.response_store import ResponseStore, request_key
+from swimming.crawl_journal import CrawlJournal
+from swimming.run_report import RunReport
+from swimming.response_decoding import DECODE_ERRORS, DecodeStats, decode_json, parse_json
+
+# Base URL for athletes endpoint; SWIM_API_BASE points the crawler at another server (e.g. benchmarks/mock_api.py)
+api_base = os.getenv('SWIM_API_BASE', 'https://api.worldaquatics.com')
+base_url = api_base + "/fina/athletes"
+
+# Parameters of the roster query; every request copies them with its own page number
+params = {
+    "gender": "",
+    "discipline": "SW",
+    "nationality": "",
+    "name": "",
+    "pageSize": 50,
+    "page": 0
+}
+
+# Columns of all_swimmers.csv, in the order the API returns them
+roster_columns = ["id", "providerId", "firstName", "lastName", "fullName", "dateOfBirth",
+                  "nationality", "gender", "disciplines", "metadata", "height"]
+roster_csv_path = "all_swimmers.csv"
+
+# Query parameters for a single page
+def page_params(page):
+    return {**params, "page": page}
+
+# Function to fetch a specific page; returns the decoded page, or None when it could not be retrieved
+async def fetch_page(session, page, store, limiter, identities, decode_stats, retries=3):
+    request_params = page_params(page)
+    for attempt in range(retries):
+        identity = identities.next()
+        await limiter.acquire()
+        try:
+            async with session.get(base_url, headers=identity.headers, params=request_params,
+                                   trace_request_ctx={'attempt': attempt}) as response:
+                if response.status == 200:
+                    limiter.record_success()
+                    identities.record_success(identity)
+                    try:
+                        body, data = decode_json(await response.read(), response.headers.get('Content-Encoding'), decode_stats)
+                    except DECODE_ERRORS as e:
+                        print(f"Failed to decode JSON response on page {page}. Error: {e}")
+                        return None
+                    store.put(request_key(base_url, request_params), body)
+                    return data
+                elif response.status == 429 or response.status >= 500:
+                    limiter.record_throttle(parse_retry_after(response.headers))
+                    if response.status == 429:
+                        identities.record_throttle(identity)
+                    print(f"Throttled with status code {response.status} on page {page}. Lowering request rate to {limiter.rate:.2f}/s...")
+                else:
+                    print(f"Failed to retrieve page {page} with status code {response.status}. Response content:")
+                    print(await response.text())
+                    return None
+        except aiohttp.ClientError as e:
+            print(f"Request failed for page {page}. Error: {e}")
+            await asyncio.sleep(2 ** attempt)  # Exponential backoff
+    print(f"Failed to retrieve page {page} after {retries} attempts.")
+    return None
+
+# Writes athletes to all_swimmers.csv as pages complete. Rows go to a temporary file that only
+# replaces the previous CSV once the crawl has finished, so a crash never leaves a partial roster.
+class RosterWriter:
+    def __init__(self, path=roster_csv_path):
+        self.path = path
+        self.partial_path = path + ".part"
+        self.handle = open(self.partial_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.handle, fieldnames=roster_columns, extrasaction="ignore")
+        self.writer.writeheader()
+        self.rows = 0
+
+    def write(self, athletes):
+        self.writer.writerows(athletes)
+        self.rows += len(athletes)
+
+    # Rows are sorted by athlete id before the CSV is replaced, so its content does not depend on
+    # the order pages completed and an unchanged roster produces an identical file
+    def close(self, commit=True):
+        self.handle.close()
+        if commit and self.rows:
+            self.sort()
+            os.replace(self.partial_path, self.path)
+        else:
+            os.remove(self.partial_path)
+
+    def sort(self):
+        with open(self.partial_path, newline="", encoding="utf-8") as handle:
+            header, *rows = list(csv.reader(handle))
+        rows.sort(key=lambda row: (int(row[0]) if row[0].isdigit() else float("inf"), row))
+        with open(self.partial_path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+# Asynchronous function to fetch the given pages on a bounded worker pool, streaming athletes to the writer.
+# Returns the pages that failed.
+async def fetch_all_athletes(session, pages, store, limiter, identities, decode_stats, journal, writer):
+    async def fetch_and_write(page):
+        data = await fetch_page(session, page, store, limiter, identities, decode_stats)
+        if data is None:
+            journal.record(page, "failed")
+            return page
+        writer.write(data.get("content", []))
+        journal.record(page, "ok")
+        return None
+
+    outcomes = await run_worker_pool(pages, fetch_and_write, concurrency=MAX_CONCURRENCY, desc='Fetching roster pages')
+    journal.commit()
+    return sorted(page for page in outcomes if page is not None)
+
+# Stream stored pages to the writer without any network calls; returns the pages not in the store
+def replay_pages(pages, store, writer):
+    missing_pages = []
+    for page in pages:
+        body = store.get(request_key(base_url, page_params(page)))
+        if body is None:
+            missing_pages.append(page)
+        else:
+            writer.write(parse_json(body).get("content", []))
+    return missing_pages
+
+# Rebuild the roster from stored pages without any network calls
+def replay_all_athletes(store, writer):
+    first_page = store.get(request_key(base_url, page_params(0)))
+    if first_page is None:
+        print(f"No stored roster pages in {store.path}.")
+        return
+    num_pages = parse_json(first_page).get("pageInfo", {}).get("numPages", 0)
+    missing_pages = replay_pages(range(num_pages), store, writer)
+    print(f"Replayed {num_pages - len(missing_pages)} of {num_pages} pages from {store.path}.")
+
+# Crawl the roster: page 0 gives the page count, completed pages of an interrupted run come
+# back from the store, and the remaining pages are fetched concurrently. A `limiter` passed in is
+# shared with other crawls of the same API, so a throttle slows them all down.
+async def crawl_all_athletes(store, journal, writer, metrics=None, limiter=None):
+    limiter = limiter or AdaptiveRateLimiter()
+    identities = IdentityPool()
+    decode_stats = DecodeStats()
+    trace_configs = [metrics.trace_config()] if metrics is not None else []
+    async with aiohttp.ClientSession(auto_decompress=False, trace_configs=trace_configs) as session:
+        first_page = await fetch_page(session, 0, store, limiter, identities, decode_stats)
+        if first_page is None:
+            print("Failed to retrieve the first roster page.")
+            return
+        num_pages = first_page.get("pageInfo", {}).get("numPages", 0)
+        print(f"Total number of pages: {num_pages}")
+        writer.write(first_page.get("content", []))
+        journal.record(0, "ok")
+
+        completed = journal.completed()
+        missing_pages = set(replay_pages([page for page in range(1, num_pages) if page in completed], store, writer))
+        pages = [page for page in range(1, num_pages) if page not in completed or page in missing_pages]
+        if journal.resumed:
+            print(f"Resuming run {journal.run_id}: {len(pages)} of {num_pages} pages outstanding.")
+        failed_pages = await fetch_all_athletes(session, pages, store, limiter, identities, decode_stats, journal, writer)
+
+        if failed_pages:
+            print(f"Retrying {len(failed_pages)} failed pages...")
+            failed_pages = await fetch_all_athletes(session, failed_pages, store, limiter, identities, decode_stats, journal, writer)
+        if failed_pages:
+            print(f"Pages still failing after retry: {failed_pages}")
+    print(f"Finished at {limiter.rate:.2f} requests/s ({limiter.successes} successes, {limiter.throttles} throttles).")
+    print(f"Request identities: {identities.summary()}.")
+    print(f"Decoding: {decode_stats.summary()}.")
+
+# Main function to run the asynchronous fetching; `writer` defaults to a RosterWriter for all_swimmers.csv.
+# A `store` passed in (e.g. shared with a concurrent results crawl) is left open; a `limiter` is
+# passed on to crawl_all_athletes.
+async def main(replay=False, fresh=False, writer=None, store=None, limiter=None):
+    own_store = store is None
+    store = store or ResponseStore()
+    writer = writer or RosterWriter()
+    journal = None
+    committed = False
+    report = RunReport('roster')
+    try:
+        if replay:
+            with report.stage('roster_replay'):
+                replay_all_athletes(store, writer)
+        else:
+            with report.stage('roster_fetch'):
+                journal = CrawlJournal('roster', fresh=fresh)
+                await crawl_all_athletes(store, journal, writer, report.requests, limiter)
+                store.evict()
+        committed = True
+    finally:
+        writer.close(commit=committed)
+        if own_store:
+            store.close()
+        else:
+            store.commit()
+        if journal is not None:
+            journal.commit()
+        report.count('athletes', writer.rows)
+        report.write()
+
+    if writer.rows:
+        print(f"Data successfully saved to {writer.path} ({writer.rows} athletes)")
+
+    if journal is not None:
+        print(f"Run {journal.run_id} outcomes: {journal.summary()}")
+        journal.finish()
+        journal.close()
+
+# Arguments of the `roster` subcommand
+def add_arguments(parser):
+    parser.add_argument('--replay', action='store_true',
+                        help='rebuild all_swimmers.csv from the response store without network calls')
+    parser.add_argument('--fresh', action='store_true',
+                        help='ignore an interrupted run in the checkpoint journal instead of resuming it')
+    add_discipline_argument(parser)
+
+def add_discipline_argument(parser):
+    parser.add_argument('--discipline', default=params["discipline"],
+                        help='discipline code to crawl, or an empty string for every discipline (default: %(default)s)')
+
+def run(args):
+    params["discipline"] = args.discipline
+    asyncio.run(main(replay=args.replay, fresh=args.fresh))
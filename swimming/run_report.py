@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import bisect
+import datetime
+import resource
+import threading
+import contextlib
+from collections import Counter
+
+# Where run reports go: one JSON file per pipeline run, plus an optional Prometheus textfile
+# (e.g. the node_exporter textfile collector directory) that is overwritten on every run
+REPORT_DIR = os.getenv('SWIM_REPORT_DIR', 'run_reports')
+PROMETHEUS_DIR = os.getenv('SWIM_PROMETHEUS_DIR')
+# How often stage peak memory is sampled
+RSS_SAMPLE_INTERVAL = float(os.getenv('SWIM_RSS_SAMPLE_SECONDS', 0.05))
+
+# Upper bounds of the request latency histogram, in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+# Current resident set size in bytes; falls back to the process peak where /proc is unavailable
+def current_rss():
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return peak_rss()
+
+
+# Peak resident set size of the process so far, in bytes (ru_maxrss is in KiB on Linux)
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Request counters filled in by aiohttp's tracing hooks: latency histogram, status codes,
+# retries and body bytes. Callers mark retries by passing trace_request_ctx={'attempt': n}.
+class RequestMetrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.latency_sum = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.status = Counter()
+        self.errors = Counter()
+
+    def observe(self, status, seconds):
+        self.requests += 1
+        self.status[str(status)] += 1
+        self.latency_sum += seconds
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    # Latency quantile estimated as the upper bound of the bucket it falls in
+    def quantile(self, q):
+        if not self.requests:
+            return 0.0
+        rank = q * self.requests
+        seen = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def trace_config(self):
+        import aiohttp
+
+        async def on_request_start(session, context, params):
+            context.started = time.perf_counter()
+            attempt = (context.trace_request_ctx or {}).get('attempt', 0)
+            if attempt:
+                self.retries += 1
+
+        async def on_request_end(session, context, params):
+            self.observe(params.response.status, time.perf_counter() - context.started)
+
+        async def on_request_exception(session, context, params):
+            self.observe('error', time.perf_counter() - context.started)
+            self.errors[type(params.exception).__name__] += 1
+
+        async def on_response_chunk_received(session, context, params):
+            self.bytes += len(params.chunk)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+        return trace_config
+
+    def to_dict(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets['+Inf'] = self.requests
+        return {
+            'count': self.requests,
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'status': dict(self.status),
+            'errors': dict(self.errors),
+            'latency_seconds': {
+                'sum': round(self.latency_sum, 6),
+                'p50': self.quantile(0.5),
+                'p95': self.quantile(0.95),
+                'p99': self.quantile(0.99),
+                'buckets': buckets,
+            },
+        }
+
+
+# Timings and metrics of one pipeline run ('roster', 'results', a results shard or the merge).
+# stage() records wall time and peak RSS of a block; a background thread samples RSS while any
+# stage is open. write() saves the JSON report and, when SWIM_PROMETHEUS_DIR is set, a
+# Prometheus textfile.
+class RunReport:
+    def __init__(self, pipeline, report_dir=REPORT_DIR, prometheus_dir=PROMETHEUS_DIR):
+        self.pipeline = pipeline
+        self.report_dir = report_dir
+        self.prometheus_dir = prometheus_dir
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.requests = RequestMetrics()
+        self._open_stages = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+        self._sampler.start()
+
+    def _sample_rss(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            rss = current_rss()
+            with self._lock:
+                for name, peak in self._open_stages.items():
+                    self._open_stages[name] = max(peak, rss)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        with self._lock:
+            self._open_stages[name] = current_rss()
+        try:
+            yield
+        finally:
+            with self._lock:
+                peak = max(self._open_stages.pop(name), current_rss())
+            self.add_stage(name, time.perf_counter() - started, peak)
+
+    # Record a stage timed elsewhere (e.g. time accumulated across many small calls)
+    def add_stage(self, name, seconds, peak_bytes=None):
+        stage = self.stages.setdefault(name, {'seconds': 0.0})
+        stage['seconds'] = round(stage['seconds'] + seconds, 3)
+        if peak_bytes is not None:
+            stage['peak_rss_mib'] = round(max(stage.get('peak_rss_mib', 0), peak_bytes / 1024 ** 2), 1)
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def to_dict(self):
+        return {
+            'pipeline': self.pipeline,
+            'started_at': datetime.datetime.fromtimestamp(self.started_at, datetime.timezone.utc).isoformat(),
+            'seconds': round(time.perf_counter() - self.started, 3),
+            'peak_rss_mib': round(peak_rss() / 1024 ** 2, 1),
+            'stages': self.stages,
+            'requests': self.requests.to_dict(),
+            'counters': self.counters,
+        }
+
+    def to_prometheus(self, report):
+        labels = f'pipeline="{self.pipeline}"'
+        requests = report['requests']
+        lines = [
+            '# TYPE swim_run_seconds gauge',
+            f'swim_run_seconds{{{labels}}} {report["seconds"]}',
+            '# TYPE swim_run_timestamp_seconds gauge',
+            f'swim_run_timestamp_seconds{{{labels}}} {self.started_at:.0f}',
+            '# TYPE swim_run_peak_rss_bytes gauge',
+            f'swim_run_peak_rss_bytes{{{labels}}} {peak_rss()}',
+            '# TYPE swim_stage_seconds gauge',
+        ]
+        lines += [f'swim_stage_seconds{{{labels},stage="{name}"}} {stage["seconds"]}' for name, stage in self.stages.items()]
+        lines.append('# TYPE swim_stage_peak_rss_bytes gauge')
+        lines += [f'swim_stage_peak_rss_bytes{{{labels},stage="{name}"}} {int(stage["peak_rss_mib"] * 1024 ** 2)}'
+                  for name, stage in self.stages.items() if 'peak_rss_mib' in stage]
+        lines.append('# TYPE swim_requests_total counter')
+        lines += [f'swim_requests_total{{{labels},status="{status}"}} {count}' for status, count in requests['status'].items()]
+        lines += [
+            '# TYPE swim_request_retries_total counter',
+            f'swim_request_retries_total{{{labels}}} {requests["retries"]}',
+            '# TYPE swim_response_bytes_total counter',
+            f'swim_response_bytes_total{{{labels}}} {requests["bytes"]}',
+            '# TYPE swim_request_duration_seconds histogram',
+        ]
+        lines += [f'swim_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                  for bound, count in requests['latency_seconds']['buckets'].items()]
+        lines += [
+            f'swim_request_duration_seconds_sum{{{labels}}} {requests["latency_seconds"]["sum"]}',
+            f'swim_request_duration_seconds_count{{{labels}}} {requests["count"]}',
+            '# TYPE swim_pipeline_count gauge',
+        ]
+        lines += [f'swim_pipeline_count{{{labels},name="{name}"}} {value}' for name, value in self.counters.items()]
+        return '\n'.join(lines) + '\n'
+
+    # Stop sampling and write the report(s); returns the JSON report path
+    def write(self):
+        self._stop.set()
+        report = self.to_dict()
+        os.makedirs(self.report_dir, exist_ok=True)
+        stamp = datetime.datetime.fromtimestamp(self.started_at, datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        path = os.path.join(self.report_dir, f'{self.pipeline}-{stamp}.json')
+        with open(path, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        if self.prometheus_dir:
+            # Written under a temporary name and renamed, so the collector never reads a partial file
+            os.makedirs(self.prometheus_dir, exist_ok=True)
+            prom_path = os.path.join(self.prometheus_dir, f'swim_{self.pipeline}.prom')
+            with open(prom_path + '.tmp', 'w') as handle:
+                handle.write(self.to_prometheus(report))
+            os.replace(prom_path + '.tmp', prom_path)
+        print(f"Run report written to {path}.")
+        return path
+
+
+# report.stage(name), or a no-op when there is no report
+def timed(report, name):
+    return report.stage(name) if report is not None else contextlib.nullcontext()